@@ -8,12 +8,14 @@ Handles tool call format conversion from GLM to standard format
 from dotenv import load_dotenv
 load_dotenv()
 
-import json
 import re
+import hashlib
+import json
 import logging
 import time
 from typing import Dict, Any, Optional, Generator
 from flask import Flask, request, Response, jsonify
+import orjson
 import requests
 
 # Import configuration and modular converters
@@ -27,39 +29,40 @@ logger = logging.getLogger(__name__)
 # Legacy ToolCallConverter for backward compatibility
 # Now replaced by modular converter system
 class ToolCallConverter:
-    """Legacy converter - now delegates to modular system"""
+    """Legacy converter - now delegates to modular system
     
-    def __init__(self, model_name: Optional[str] = None):
-        self.model_name = model_name
-        self._converter = None
+    Stateless: every method is a classmethod resolving a shared converter
+    from the factory, so callers can use the class without instantiating it.
+    """
     
-    def _get_converter(self):
-        if self._converter is None:
-            self._converter = converter_factory.get_converter(self.model_name or "")
-        return self._converter
+    # The legacy parse helpers always targeted GLM-formatted content
+    LEGACY_MODEL = 'glm'
     
-    def parse_glm_tool_calls(self, content: str) -> list:
+    @classmethod
+    def _get_converter(cls):
+        return converter_factory.get_converter(cls.LEGACY_MODEL)
+    
+    @classmethod
+    def parse_glm_tool_calls(cls, content: str) -> list:
         """Legacy method - delegates to modular converter"""
-        return self._get_converter().parse_tool_calls(content)
+        return cls._get_converter().parse_tool_calls(content)
     
-    def has_partial_tool_call(self, content: str) -> bool:
+    @classmethod
+    def has_partial_tool_call(cls, content: str) -> bool:
         """Legacy method - delegates to modular converter"""
-        return self._get_converter().has_partial_tool_call(content)
+        return cls._get_converter().has_partial_tool_call(content)
     
-    def is_complete_tool_call(self, content: str) -> bool:
+    @classmethod
+    def is_complete_tool_call(cls, content: str) -> bool:
         """Legacy method - delegates to modular converter"""
-        return self._get_converter().is_complete_tool_call(content)
+        return cls._get_converter().is_complete_tool_call(content)
     
-    def convert_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
+    @classmethod
+    def convert_response(cls, response_data: Dict[str, Any]) -> Dict[str, Any]:
         """Legacy method - delegates to modular converter"""
-        # Try to detect model from response if not set
-        if not self.model_name:
-            detected_model = converter_factory.detect_model_from_response(response_data)
-            if detected_model:
-                self.model_name = detected_model
-                self._converter = None  # Reset to get new converter
-        
-        return self._get_converter().convert_response(response_data)
+        # Detect model from response; unknown models pass through unchanged
+        model_name = converter_factory.detect_model_from_response(response_data)
+        return converter_factory.get_converter(model_name or "").convert_response(response_data)
 
 # Legacy StreamingToolCallHandler for backward compatibility
 class StreamingToolCallHandler:
@@ -90,17 +93,25 @@ class StreamingToolCallHandler:
 class ProxyHandler:
     """Handles proxy requests to backend API"""
     
+    # orjson reads integers outside the 64-bit range as floats. Bodies with a
+    # digit run this long may hold one, so they go through the stdlib json
+    # module instead, which keeps them exact
+    WIDE_INT_PATTERN = re.compile(rb'\d{19}')
+    
     def __init__(self, backend_url: Optional[str] = None):
         self.backend_url = backend_url or config.backend_url
         # Model-specific converter will be determined per request
     
-    def forward_request(self, path: str, stream: bool = False, convert_tool_calls: bool = False):
+    def forward_request(self, path: str, stream: bool = False, convert_tool_calls: bool = False,
+                        extra_headers: Optional[Dict[str, str]] = None):
         """Forward request to backend and handle response"""
         try:
             # Prepare request
             url = f"{self.backend_url}{path}"
             headers = dict(request.headers)
             headers.pop('Host', None)
+            if extra_headers:
+                headers.update(extra_headers)
             
             # Forward request with appropriate timeout
             timeout = config.STREAMING_TIMEOUT if stream else config.REQUEST_TIMEOUT
@@ -127,11 +138,44 @@ class ProxyHandler:
             logger.error(f"Proxy error: {e}")
             return jsonify({"error": "Proxy request failed"}), 500
     
+    def conversation_headers(self, request_data: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Build the X-Conversation-Id header for a chat request
+
+        The id hashes the opening of the conversation (every message up to
+        and including the first user message), so all later turns share it
+        and backends with prompt-prefix caching can reuse their KV cache. It
+        is a prefix-cache key, not a session id: separate conversations that
+        open identically (same system prompt and first user message) get the
+        same id, which is exactly when their cached prefix is shareable.
+        Clients that need per-session ids should send the header themselves;
+        a client-supplied header is left untouched, and backends that don't
+        know the header simply ignore it.
+
+        Malformed requests, and openings orjson can't serialize (such as
+        integers wider than 64 bits), get no header, so they still reach the
+        backend and receive its own response.
+        """
+        if not config.ENABLE_CONVERSATION_ID or 'X-Conversation-Id' in request.headers:
+            return {}
+        messages = request_data.get('messages') if isinstance(request_data, dict) else None
+        if not messages or not isinstance(messages, list):
+            return {}
+        opening = next((i for i, m in enumerate(messages) if isinstance(m, dict) and m.get('role') == 'user'), 0)
+        try:
+            prefix = orjson.dumps(messages[:opening + 1], option=orjson.OPT_SORT_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            return {}
+        return {'X-Conversation-Id': hashlib.sha1(prefix).hexdigest()[:16]}
+    
     def _handle_regular_response(self, response: requests.Response, convert_tool_calls: bool = False) -> Response:
         """Handle non-streaming response"""
         try:
             # Try to parse as JSON and convert tool calls if requested
-            response_data = response.json()
+            exact_ints = self.WIDE_INT_PATTERN.search(response.content) is not None
+            if exact_ints:
+                response_data = json.loads(response.content)
+            else:
+                response_data = orjson.loads(response.content)
             
             if convert_tool_calls:
                 # Detect model and get appropriate converter
@@ -141,14 +185,20 @@ class ProxyHandler:
             else:
                 converted_data = response_data
             
+            if exact_ints:
+                body = json.dumps(converted_data, ensure_ascii=False, separators=(',', ':')).encode()
+            else:
+                body = orjson.dumps(converted_data)
+            
             return Response(
-                json.dumps(converted_data),
+                body,
                 status=response.status_code,
                 headers=dict(response.headers),
                 mimetype='application/json'
             )
-        except json.JSONDecodeError:
-            # Return as-is if not JSON
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # Return as-is if not JSON; orjson.JSONDecodeError subclasses
+            # json.JSONDecodeError
             return Response(
                 response.content,
                 status=response.status_code,
@@ -182,12 +232,12 @@ class ProxyHandler:
                             if handler:
                                 final_chunk = handler.finalize()
                                 if final_chunk:
-                                    yield f"data: {json.dumps(final_chunk, ensure_ascii=False)}\n\n"
+                                    yield f"data: {orjson.dumps(final_chunk).decode()}\n\n"
                             yield "data: [DONE]\n\n"
                             break
                         
                         try:
-                            chunk_data = json.loads(data)
+                            chunk_data = orjson.loads(data)
                             
                             # Initialize handler with model from first chunk
                             if handler is None:
@@ -197,9 +247,9 @@ class ProxyHandler:
                             processed_chunk = handler.process_chunk(chunk_data)
                             
                             if processed_chunk:
-                                yield f"data: {json.dumps(processed_chunk, ensure_ascii=False)}\n\n"
+                                yield f"data: {orjson.dumps(processed_chunk).decode()}\n\n"
                                 
-                        except json.JSONDecodeError:
+                        except orjson.JSONDecodeError:
                             # Pass through non-JSON data with proper SSE format
                             logger.debug(f"JSON decode error found in streaming path; passing non-JSON data: {decoded_line}")
                             yield f"{decoded_line}\n\n"
@@ -226,10 +276,13 @@ class ProxyHandler:
                             yield f"{decoded_line}\n\n"
         
         # Set proper headers for SSE streaming
+        # X-Accel-Buffering stops reverse proxies such as nginx from holding
+        # back deltas until their buffer fills
         headers = {
             'Content-Type': 'text/event-stream',
             'Cache-Control': 'no-cache',
             'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no',
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Headers': 'Content-Type',
         }
@@ -261,7 +314,8 @@ def chat_completions():
         # Check if tool call conversion is enabled
         convert_tools = config.ENABLE_TOOL_CALL_CONVERSION
         
-        return proxy.forward_request('/v1/chat/completions', stream=stream, convert_tool_calls=convert_tools)
+        return proxy.forward_request('/v1/chat/completions', stream=stream, convert_tool_calls=convert_tools,
+                                     extra_headers=proxy.conversation_headers(request_data))
         
     except Exception as e:
         logger.error(f"Chat completions error: {e}")
@@ -310,8 +364,9 @@ def proxy_all(path):
     headers = [(name, value) for (name, value) in resp.raw.headers.items()
                if name.lower() not in excluded_headers]
 
-    # Create a new Flask response object from the backend's response
-    response = Response(resp.content, resp.status_code, headers)
+    # Create a new Flask response object from the backend's response,
+    # relaying the body as it arrives instead of buffering it all first
+    response = Response(resp.iter_content(chunk_size=8192), resp.status_code, headers)
     return response
 
 if __name__ == '__main__':
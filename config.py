@@ -7,6 +7,10 @@ import os
 from typing import Dict, Any, Optional
 
 
+# STREAMING_TIMEOUT spellings that disable the streaming timeout
+DISABLED_TIMEOUT_VALUES = frozenset({'none', 'null', '0', 'false'})
+
+
 class Config:
     """Configuration class for proxy server settings"""
     
@@ -26,7 +30,7 @@ class Config:
         # Streaming timeout settings
         self.STREAMING_TIMEOUT = os.getenv('STREAMING_TIMEOUT', '3600')  # Default 60 minutes
         # Set to 'None' or '0' to disable timeout for streaming
-        if self.STREAMING_TIMEOUT.lower() in ['none', 'null', '0', 'false']:
+        if self.STREAMING_TIMEOUT.lower() in DISABLED_TIMEOUT_VALUES:
             self.STREAMING_TIMEOUT = None
         else:
             self.STREAMING_TIMEOUT = int(self.STREAMING_TIMEOUT)
@@ -37,6 +41,10 @@ class Config:
         # Tool call conversion settings
         self.ENABLE_TOOL_CALL_CONVERSION = os.getenv('ENABLE_TOOL_CALL_CONVERSION', 'true').lower() == 'true'
         
+        # Opt-in: attach an X-Conversation-Id header so backends can reuse
+        # prompt-prefix caches
+        self.ENABLE_CONVERSATION_ID = os.getenv('ENABLE_CONVERSATION_ID', 'false').lower() == 'true'
+        
         # Content filtering settings
         self.REMOVE_THINK_TAGS = os.getenv('REMOVE_THINK_TAGS', 'true').lower() == 'true'
         
@@ -76,7 +84,8 @@ class Config:
             'backend': self.get_backend_config(),
             'proxy': self.get_proxy_config(),
             'features': {
-                'tool_call_conversion': self.ENABLE_TOOL_CALL_CONVERSION
+                'tool_call_conversion': self.ENABLE_TOOL_CALL_CONVERSION,
+                'conversation_id': self.ENABLE_CONVERSATION_ID
             },
             'logging': {
                 'level': self.LOG_LEVEL
@@ -11,6 +11,10 @@ import re
 class ToolCallConverter(ABC):
     """Abstract base class for tool call format converters"""
     
+    # Think-tag patterns compiled once and shared by every converter
+    EMPTY_THINK_PATTERN = re.compile(r'<think>\s*</think>', re.DOTALL)
+    THINK_BLOCK_PATTERN = re.compile(r'<think>.*?</think>', re.DOTALL)
+    
     @abstractmethod
     def can_handle_model(self, model_name: str) -> bool:
         """Check if this converter can handle the given model"""
@@ -46,6 +50,8 @@ class ToolCallConverter(ABC):
                 continue
                 
             content = message['content']
+            if not content:
+                continue
             if not self.has_partial_tool_call(content):
                 # Still apply common cleanup even if no tool calls
                 content = self._remove_empty_think_tags(content)
@@ -54,12 +60,10 @@ class ToolCallConverter(ABC):
                     modified = True
                 continue
             
-            # Parse tool calls from content
-            tool_calls = self.parse_tool_calls(content)
+            # Parse tool calls and remove their text from content
+            tool_calls, clean_content = self.parse_and_clean(content)
             
             if tool_calls:
-                # Remove tool call text from content
-                clean_content = self._clean_content(content)
                 # Apply common cleanup
                 clean_content = self._remove_empty_think_tags(clean_content)
                 
@@ -73,6 +77,18 @@ class ToolCallConverter(ABC):
         
         return response_data
     
+    def parse_and_clean(self, content: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Parse tool calls and return them with the cleaned content
+        
+        Content is only cleaned when tool calls were found; otherwise it is
+        returned unchanged. Converters can override this to share a single
+        scan between parsing and cleaning.
+        """
+        tool_calls = self.parse_tool_calls(content)
+        if not tool_calls:
+            return tool_calls, content
+        return tool_calls, self._clean_content(content)
+    
     def _remove_empty_think_tags(self, content: str) -> str:
         """Remove empty <think></think> tags from content (common cleanup)"""
         if not content:
@@ -80,7 +96,7 @@ class ToolCallConverter(ABC):
             
         # Remove empty think tags with any amount of whitespace inside
         # This handles: <think></think>, <think> </think>, <think>\n</think>, etc.
-        content = re.sub(r'<think>\s*</think>', '', content, flags=re.DOTALL)
+        content = self.EMPTY_THINK_PATTERN.sub('', content)
         
         return content
     
@@ -139,13 +155,11 @@ class StreamingToolCallHandler(ABC):
     
     def _convert_to_tool_call_chunk(self, original_chunk: Dict[str, Any]) -> Dict[str, Any]:
         """Convert accumulated content to tool call chunks"""
-        tool_calls = self.converter.parse_tool_calls(self.buffer)
+        tool_calls, clean_content = self.converter.parse_and_clean(self.buffer)
         
         if not tool_calls:
             return original_chunk
         
-        # Clean content
-        clean_content = self.converter._clean_content(self.buffer)
         # Apply common cleanup
         clean_content = self.converter._remove_empty_think_tags(clean_content)
         
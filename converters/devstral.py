@@ -21,7 +21,7 @@ import re
 from typing import Dict, Any, List
 
 from .base import ToolCallConverter, StreamingToolCallHandler
-from config import Config
+from config import config
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +37,9 @@ class DevstralToolCallConverter(ToolCallConverter):
     DEVSTRAL_MODEL_PATTERNS = [r".*devstral.*", r".*devstral.*"]
 
     def __init__(self):
-        self.config = Config()
+        # The shared process-wide Config, not a fresh parse per converter;
+        # streaming handlers build a converter for every request
+        self.config = config
 
     # ------------------------------------------------------------------
     # ToolCallConverter API
@@ -86,7 +88,7 @@ class DevstralToolCallConverter(ToolCallConverter):
         content = re.sub(pattern, "", content, flags=re.DOTALL)
         # If config removes think tags, strip them.
         if self.config.REMOVE_THINK_TAGS:
-            content = re.sub(r"<think>.*?</think>", "", content, flags=re.DOTALL)
+            content = self.THINK_BLOCK_PATTERN.sub("", content)
         return content.strip()
 
 
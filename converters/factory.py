@@ -19,6 +19,8 @@ class ConverterFactory:
     """Factory class for creating model-specific tool call converters"""
     
     def __init__(self):
+        # Shared fallback so unknown models don't allocate a converter per request
+        self._fallback = PassThroughConverter()
         # Register available converters (order matters – most specific first)
         self._converters: List[ToolCallConverter] = [
             # Specific converters first
@@ -28,13 +30,13 @@ class ConverterFactory:
             GLMToolCallConverter(),
             OpenAIToolCallConverter(),
             ClaudeToolCallConverter(),
-            PassThroughConverter(),  # Fallback – should be last
+            self._fallback,  # Fallback – should be last
         ]
     
     def get_converter(self, model_name: str) -> ToolCallConverter:
         """Get appropriate converter for the given model"""
         if not model_name:
-            return PassThroughConverter()
+            return self._fallback
         
         for converter in self._converters:
             if converter.can_handle_model(model_name):
@@ -43,7 +45,7 @@ class ConverterFactory:
         
         logger.debug("Returning PassThroughConverter")
         # Fallback to pass-through
-        return PassThroughConverter()
+        return self._fallback
     
     def get_streaming_handler(self, model_name: str) -> StreamingToolCallHandler:
         """Get appropriate streaming handler for the given model"""
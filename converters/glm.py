@@ -5,9 +5,9 @@ GLM model specific tool call converter
 
 import json
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from .base import ToolCallConverter, StreamingToolCallHandler
-from config import Config
+from config import config
 
 
 class GLMToolCallConverter(ToolCallConverter):
@@ -19,10 +19,27 @@ class GLMToolCallConverter(ToolCallConverter):
         r'chatglm-.*', 
         r'.*glm.*'
     ]
+
+    # Compiled once and shared by every instance
+    TOOL_REQUEST_PATTERN = re.compile(r'\[TOOL_REQUEST\]\s*(\{.*?\})\s*\[END_TOOL_REQUEST\]', re.DOTALL)
+    TOOL_REQUEST_BLOCK_PATTERN = re.compile(r'\[TOOL_REQUEST\].*?\[END_TOOL_REQUEST\]', re.DOTALL)
+    LEGACY_BLOCK_PATTERN = re.compile(r'<tool_call>.*?</tool_call>', re.DOTALL)
+
+    # Reasoning delimiters stripped by _clean_content
+    THINK_OPEN = '<think>'
+    THINK_CLOSE = '</think>'
+
+    # Markers that indicate (possibly partial) GLM tool call markup
+    TOOL_CALL_MARKERS = (
+        '<tool_call>', '</tool_call>', '<arg_key>', '</arg_key>', '<arg_value>', '</arg_value>',
+        '[TOOL_REQUEST]', '[END_TOOL_REQUEST]',
+    )
     
     def __init__(self):
         """Initialize GLM converter with config"""
-        self.config = Config()
+        # The shared process-wide Config, not a fresh parse per converter;
+        # streaming handlers build a converter for every request
+        self.config = config
     
     def can_handle_model(self, model_name: str) -> bool:
         """Check if this converter can handle GLM models"""
@@ -37,15 +54,44 @@ class GLMToolCallConverter(ToolCallConverter):
     
     def parse_tool_calls(self, content: str) -> List[Dict[str, Any]]:
         """Parse GLM format tool calls from content"""
+        return self._parse_tool_calls(content)
+
+    def parse_and_clean(self, content: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Parse tool calls and clean content sharing one <tool_call> scan
+
+        The legacy block spans found while parsing are cut out directly, so
+        LEGACY_BLOCK_PATTERN never has to rescan the content.
+        """
+        block_spans = []
+        tool_calls = self._parse_tool_calls(content, block_spans)
+        if not tool_calls:
+            return tool_calls, content
+        if block_spans:
+            pieces = []
+            start = 0
+            for block_start, block_end in block_spans:
+                pieces.append(content[start:block_start])
+                start = block_end
+            pieces.append(content[start:])
+            content = ''.join(pieces)
+        return tool_calls, self._clean_without_legacy_blocks(content)
+
+    def _parse_tool_calls(self, content: str, block_spans: Optional[List[Tuple[int, int]]] = None) -> List[Dict[str, Any]]:
+        """Parse GLM tool calls, recording legacy block spans into block_spans"""
         tool_calls = []
+
+        # Cheap substring checks avoid starting the regex engine (and the
+        # debug dump) for the common completion with no tool call at all
+        has_tool_request = '[TOOL_REQUEST]' in content
+        if not has_tool_request and '<tool_call>' not in content:
+            return tool_calls
         
         print(f"[DEBUG] GLM Tool Call Parser - Input content:")
         print(f"[DEBUG] {repr(content)}")
         print(f"[DEBUG] Content preview: {content[:200]}...")
         
         # Method 1: Parse new [TOOL_REQUEST] format
-        tool_request_pattern = r'\[TOOL_REQUEST\]\s*(\{.*?\})\s*\[END_TOOL_REQUEST\]'
-        tool_request_matches = re.findall(tool_request_pattern, content, re.DOTALL)
+        tool_request_matches = self.TOOL_REQUEST_PATTERN.findall(content) if has_tool_request else []
         
         print(f"[DEBUG] TOOL_REQUEST matches found: {len(tool_request_matches)}")
         
@@ -70,23 +116,15 @@ class GLMToolCallConverter(ToolCallConverter):
                 print(f"[DEBUG] Invalid JSON: {repr(json_str)}")
         
         # Method 2: Parse legacy <tool_call> format - handle both single and multi parameters
-        legacy_pattern = r'<tool_call>\s*(.*?)\s*((?:<arg_key>.*?</arg_key>\s*<arg_value>.*?</arg_value>\s*)+)\s*</tool_call>'
-        legacy_matches = re.findall(legacy_pattern, content, re.DOTALL)
-        
+        legacy_matches = self._scan_legacy_tool_calls(content, block_spans)
+
         print(f"[DEBUG] Legacy format matches found: {len(legacy_matches)}")
-        
-        for i, (function_name, args_section) in enumerate(legacy_matches):
-            # Parse all arg_key/arg_value pairs  
-            arg_pattern = r'<arg_key>\s*(.*?)\s*</arg_key>\s*<arg_value>\s*(.*?)\s*</arg_value>'
-            arg_matches = re.findall(arg_pattern, args_section, re.DOTALL)
-            
-            print(f"[DEBUG] Found {len(arg_matches)} argument pairs for function {function_name.strip()}")
-            
+
+        for i, (function_name, arg_matches) in enumerate(legacy_matches):
+            print(f"[DEBUG] Found {len(arg_matches)} argument pairs for function {function_name}")
+
             arguments = {}
-            for arg_key, arg_value in arg_matches:
-                key = arg_key.strip()
-                value = arg_value.strip()
-                
+            for key, value in arg_matches:
                 # Try to parse arg_value as JSON first
                 try:
                     parsed_value = json.loads(value)
@@ -102,7 +140,7 @@ class GLMToolCallConverter(ToolCallConverter):
                 "type": "function",
                 "function": {
                     "name": function_name.strip(),
-                    "arguments": json.dumps(arguments, ensure_ascii=False)
+                    "arguments": self._dump_arguments(arguments)
                 }
             }
             tool_calls.append(tool_call)
@@ -110,67 +148,153 @@ class GLMToolCallConverter(ToolCallConverter):
         
         print(f"[DEBUG] Total tool calls parsed: {len(tool_calls)}")
         return tool_calls
-    
+
+    def _dump_arguments(self, arguments: Dict[str, Any]) -> str:
+        """Serialize parsed arguments, skipping the JSON encoder when possible
+
+        The common GLM call has a single string argument. When neither the key
+        nor the value needs escaping, the result is built directly and matches
+        json.dumps(arguments, ensure_ascii=False) byte for byte.
+        """
+        if len(arguments) == 1:
+            (key, value), = arguments.items()
+            if (isinstance(value, str)
+                    and key.isprintable() and value.isprintable()
+                    and '"' not in key and '\\' not in key
+                    and '"' not in value and '\\' not in value):
+                return '{"' + key + '": "' + value + '"}'
+        return json.dumps(arguments, ensure_ascii=False)
+
+    def _scan_legacy_tool_calls(self, content: str, block_spans: Optional[List[Tuple[int, int]]] = None) -> List[Tuple[str, List[Tuple[str, str]]]]:
+        """Scan legacy <tool_call> blocks in a single forward pass.
+
+        Uses str.find instead of lazy DOTALL regexes so long completions with
+        many blocks are scanned linearly without backtracking. Returns a list
+        of (function_name, [(arg_key, arg_value), ...]) tuples; blocks without
+        any arg_key/arg_value pair are skipped. When block_spans is given, the
+        (start, end) span of every complete block is appended to it; these
+        are exactly the matches of LEGACY_BLOCK_PATTERN.
+        """
+        results = []
+        pos = 0
+        while True:
+            start = content.find('<tool_call>', pos)
+            if start == -1:
+                break
+            body_start = start + len('<tool_call>')
+            end = content.find('</tool_call>', body_start)
+            if end == -1:
+                break
+            pos = end + len('</tool_call>')
+            if block_spans is not None:
+                block_spans.append((start, pos))
+
+            first_key = content.find('<arg_key>', body_start, end)
+            if first_key == -1:
+                continue
+            function_name = content[body_start:first_key].strip()
+
+            args = []
+            key_start = first_key
+            while key_start != -1:
+                key_end = content.find('</arg_key>', key_start, end)
+                value_start = content.find('<arg_value>', key_end, end) if key_end != -1 else -1
+                value_end = content.find('</arg_value>', value_start, end) if value_start != -1 else -1
+                if value_end == -1:
+                    break
+                key = content[key_start + len('<arg_key>'):key_end].strip()
+                value = content[value_start + len('<arg_value>'):value_end].strip()
+                args.append((key, value))
+                key_start = content.find('<arg_key>', value_end, end)
+
+            if args:
+                results.append((function_name, args))
+        return results
+
     def has_partial_tool_call(self, content: str) -> bool:
         """Check if content contains partial GLM tool call markup"""
-        # Check for legacy format markers
-        legacy_markers = ['<tool_call>', '</tool_call>', '<arg_key>', '</arg_key>', '<arg_value>', '</arg_value>']
-        # Check for new format markers
-        new_markers = ['[TOOL_REQUEST]', '[END_TOOL_REQUEST]']
-        
-        return any(marker in content for marker in legacy_markers + new_markers)
+        return any(marker in content for marker in self.TOOL_CALL_MARKERS)
     
     def is_complete_tool_call(self, content: str) -> bool:
         """Check if content contains complete GLM tool call markup"""
         # Check for complete legacy format
-        legacy_complete = bool(re.search(r'<tool_call>.*?</tool_call>', content, re.DOTALL))
+        legacy_complete = bool(self.LEGACY_BLOCK_PATTERN.search(content))
         # Check for complete new format
-        new_complete = bool(re.search(r'\[TOOL_REQUEST\].*?\[END_TOOL_REQUEST\]', content, re.DOTALL))
+        new_complete = bool(self.TOOL_REQUEST_BLOCK_PATTERN.search(content))
         
         return legacy_complete or new_complete
     
-    def _clean_content(self, content: str) -> str:
-        """Remove GLM tool call markup and malformed think tags from content"""
+    def _clean_content(self, content: str, remove_think_tags: Optional[bool] = None) -> str:
+        """Remove GLM tool call markup and malformed think tags from content
+
+        remove_think_tags overrides the REMOVE_THINK_TAGS setting for this call.
+        """
         # Remove legacy format
-        content = re.sub(r'<tool_call>.*?</tool_call>', '', content, flags=re.DOTALL)
+        if '<tool_call>' in content:
+            content = self.LEGACY_BLOCK_PATTERN.sub('', content)
+        return self._clean_without_legacy_blocks(content, remove_think_tags)
+    
+    def _clean_without_legacy_blocks(self, content: str, remove_think_tags: Optional[bool] = None) -> str:
+        """Rest of _clean_content once legacy <tool_call> blocks are gone"""
+        if remove_think_tags is None:
+            remove_think_tags = self.config.REMOVE_THINK_TAGS
         # Remove new format
-        content = re.sub(r'\[TOOL_REQUEST\].*?\[END_TOOL_REQUEST\]', '', content, flags=re.DOTALL)
+        if '[TOOL_REQUEST]' in content:
+            content = self.TOOL_REQUEST_BLOCK_PATTERN.sub('', content)
+        
+        # Fast path: 'think>' ends both tags, so one scan rules out any
+        # think markup and the remaining passes would not change anything,
+        # whatever REMOVE_THINK_TAGS is (orphaned openers are stripped even
+        # with removal off, so '</think>' alone is not enough to check).
+        # str.strip returns the input itself when there is nothing to strip.
+        if 'think>' not in content:
+            return content.strip()
         
         # Remove complete <think>...</think> pairs based on config setting
-        if self.config.REMOVE_THINK_TAGS:
+        if remove_think_tags:
             print(f"[DEBUG] Removing complete <think>...</think> pairs (REMOVE_THINK_TAGS=true)")
-            content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
+            content = self._remove_think_blocks(content)
         else:
             print(f"[DEBUG] Keeping complete <think>...</think> pairs (REMOVE_THINK_TAGS=false)")
         
         # Always remove orphaned </think> tags (closing tags without opening tags)
-        orphaned_closing_count = len(re.findall(r'</think>', content))
+        orphaned_closing_count = content.count(self.THINK_CLOSE)
         if orphaned_closing_count > 0:
             print(f"[DEBUG] Removing {orphaned_closing_count} orphaned </think> tags")
-            content = re.sub(r'</think>', '', content)
+            content = content.replace(self.THINK_CLOSE, '')
         
-        # Always remove orphaned <think> tags (opening tags without closing tags) 
-        content = self._remove_orphaned_think_tags(content)
+        # Always remove orphaned <think> tags; with every </think> gone above,
+        # no remaining opening tag can be matched
+        orphaned_opening_count = content.count(self.THINK_OPEN)
+        if orphaned_opening_count > 0:
+            print(f"[DEBUG] Removing {orphaned_opening_count} orphaned <think> tags")
+            content = content.replace(self.THINK_OPEN, '')
         
         return content.strip()
     
-    def _remove_orphaned_think_tags(self, content: str) -> str:
-        """Remove orphaned <think> tags that don't have matching </think> tags"""
-        # This handles cases where <think> is opened but never closed
-        result = []
-        i = 0
-        while i < len(content):
-            if content[i:].startswith('<think>'):
-                # Found opening tag, look for closing tag
-                remaining = content[i+7:]  # Skip '<think>'
-                if '</think>' not in remaining:
-                    # No closing tag found, skip this opening tag
-                    print(f"[DEBUG] Removing orphaned <think> tag at position {i}")
-                    i += 7  # Skip '<think>'
-                    continue
-            result.append(content[i])
-            i += 1
-        return ''.join(result)
+    def _remove_think_blocks(self, content: str) -> str:
+        """Remove each <think> up to the next </think> in a single forward pass
+
+        Equivalent to THINK_BLOCK_PATTERN.sub('', content) without backtracking;
+        test_think_tags cross-checks the two. Tags are located by index and
+        only the retained spans are sliced, so the remainder of the content
+        is never copied per tag. An opening tag with no closing tag after it
+        is left in place for the orphaned-tag pass, so the text after it is
+        kept.
+        """
+        out = []
+        start = 0
+        while True:
+            open_at = content.find(self.THINK_OPEN, start)
+            if open_at == -1:
+                break
+            close_at = content.find(self.THINK_CLOSE, open_at + len(self.THINK_OPEN))
+            if close_at == -1:
+                break
+            out.append(content[start:open_at])
+            start = close_at + len(self.THINK_CLOSE)
+        out.append(content[start:])
+        return ''.join(out)
 
 
 class GLMStreamingHandler(StreamingToolCallHandler):
@@ -18,7 +18,7 @@ import re
 from typing import Dict, Any, List
 
 from .base import ToolCallConverter, StreamingToolCallHandler
-from config import Config
+from config import config
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,9 @@ class Qwen3ToolCallConverter(ToolCallConverter):
     QWEN3_MODEL_PATTERNS = [r".*qwen3.*", r".*jan[-_ ]nano.*", r"aquif[-_ ]3.5"]
 
     def __init__(self):
-        self.config = Config()
+        # The shared process-wide Config, not a fresh parse per converter;
+        # streaming handlers build a converter for every request
+        self.config = config
 
     def can_handle_model(self, model_name: str) -> bool:
         if not model_name:
@@ -78,7 +80,7 @@ class Qwen3ToolCallConverter(ToolCallConverter):
         content = re.sub(r"<tool_call>.*?</tool_call>", "", content, flags=re.DOTALL)
         # Handle <think> tags as the GLM converter does.
         if self.config.REMOVE_THINK_TAGS:
-            content = re.sub(r"<think>.*?</think>", "", content, flags=re.DOTALL)
+            content = self.THINK_BLOCK_PATTERN.sub("", content)
         else:
             logger.debug(f"Keeping complete <think>...</think> pairs (REMOVE_THINK_TAGS=false)")
         content = self._remove_orphaned_think_tags(content)
@@ -26,7 +26,7 @@ import re
 from typing import Dict, Any, List
 
 from .base import ToolCallConverter, StreamingToolCallHandler
-from config import Config
+from config import config
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +36,9 @@ class Qwen3CoderToolCallConverter(ToolCallConverter):
     QWEN3_CODER_MODEL_PATTERNS = [r".*qwen3[-_]coder.*", r".*kat[-_]dev.*"]
 
     def __init__(self):
-        self.config = Config()
+        # The shared process-wide Config, not a fresh parse per converter;
+        # streaming handlers build a converter for every request
+        self.config = config
 
     def can_handle_model(self, model_name: str) -> bool:
         if not model_name:
@@ -96,7 +98,7 @@ class Qwen3CoderToolCallConverter(ToolCallConverter):
         content = re.sub(r"</function>", "", content)
         content = re.sub(r"</parameter>", "", content)
         if self.config.REMOVE_THINK_TAGS:
-            content = re.sub(r"<think>.*?</think>", "", content, flags=re.DOTALL)
+            content = self.THINK_BLOCK_PATTERN.sub("", content)
         else:
             logger.debug(f"Keeping complete <think>...</think> pairs (REMOVE_THINK_TAGS=false)")
         content = self._remove_orphaned_think_tags(content)
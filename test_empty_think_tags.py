@@ -55,10 +55,6 @@ def test_glm_converter_integration():
     print("Testing GLM Converter Integration")
     print("=" * 50)
     
-    import os
-    # Test with REMOVE_THINK_TAGS=false to see if empty tags are still removed
-    os.environ['REMOVE_THINK_TAGS'] = 'false'
-    
     converter = GLMToolCallConverter()
     
     content = """
@@ -71,8 +67,9 @@ def test_glm_converter_integration():
     </think>
     """
     
+    # Test with REMOVE_THINK_TAGS=false to see if empty tags are still removed
     print("Testing with REMOVE_THINK_TAGS=false (content tags should be preserved)")
-    cleaned = converter._clean_content(content)
+    cleaned = converter._clean_content(content, remove_think_tags=False)
     print(f"Original: {repr(content)}")
     print(f"Cleaned:  {repr(cleaned)}")
     
@@ -3,6 +3,8 @@
 Test new GLM tool calling formats with debugging
 """
 
+import json
+
 from converters.glm import GLMToolCallConverter
 
 def test_new_format():
@@ -115,11 +117,27 @@ legacy_function
     print(f"Result: {len(tool_calls)} tool calls")
     print()
 
+def test_legacy_arguments_serialization():
+    """Test fast-path argument serialization matches json.dumps"""
+    print("Testing Legacy Argument Serialization")
+    print("=" * 50)
+
+    converter = GLMToolCallConverter()
+
+    for value in ['Kyungju Korea', '경주 역사', 'say "hi"', 'C:\\path', 'line1\nline2']:
+        content = f'<tool_call>fetch_wikipedia_content\n<arg_key>search_query</arg_key>\n<arg_value>{value}</arg_value>\n</tool_call>'
+        tool_calls = converter.parse_tool_calls(content)
+        arguments = tool_calls[0]['function']['arguments']
+        assert arguments == json.dumps({'search_query': value}, ensure_ascii=False)
+        assert json.loads(arguments)['search_query'] == value
+    print()
+
 if __name__ == "__main__":
     test_new_format()
     test_legacy_multi_param() 
     test_multiline_json()
     test_mixed_formats()
+    test_legacy_arguments_serialization()
     
     print("=" * 50)
     print("GLM Format Testing Complete")
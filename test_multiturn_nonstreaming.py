@@ -3,74 +3,93 @@
 Test multi-turn conversation without streaming (for now)
 """
 
-import json
+import argparse
+import atexit
+import functools
 import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import orjson
+import requests
 from openai import OpenAI
 
-# Initialize client (using proxy server)
-client = OpenAI(base_url="http://127.0.0.1:5000", api_key="lm-studio")
+# Initialize client (using proxy server) with a pool large enough for the
+# concurrent tool-call and prefetch traffic
+_http = httpx.Client(
+    timeout=300,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+)
+atexit.register(_http.close)
+client = OpenAI(base_url="http://127.0.0.1:5000", api_key="lm-studio", http_client=_http)
 MODEL = "glm-4.5-air-hi-mlx@4bit"
 
-def fetch_wikipedia_content(search_query: str) -> dict:
-    """Fetches wikipedia content for a given search_query"""
-    try:
-        import urllib.parse
-        import urllib.request
-        
-        # Search for most relevant article
-        search_url = "https://en.wikipedia.org/w/api.php"
-        search_params = {
-            "action": "query",
-            "format": "json",
-            "list": "search",
-            "srsearch": search_query,
-            "srlimit": 1,
-        }
+# Shared keep-alive session so every tool call reuses one connection to
+# en.wikipedia.org
+WIKI_API_URL = "https://en.wikipedia.org/w/api.php"
+_WIKI = requests.Session()
+# requests transparently decompresses gzip bodies, so ask for them
+# explicitly to keep the extract payload small on the wire
+_WIKI.headers.update({"User-Agent": "toolcall-proxy-test/1", "Accept-Encoding": "gzip"})
+atexit.register(_WIKI.close)
 
-        url = f"{search_url}?{urllib.parse.urlencode(search_params)}"
-        with urllib.request.urlopen(url) as response:
-            search_data = json.loads(response.read().decode())
-
-        if not search_data["query"]["search"]:
-            return {
-                "status": "error",
-                "message": f"No Wikipedia article found for '{search_query}'",
-            }
-
-        # Get the normalized title from search results
-        normalized_title = search_data["query"]["search"][0]["title"]
-
-        # Now fetch the actual content with the normalized title
-        content_params = {
-            "action": "query",
-            "format": "json",
-            "titles": normalized_title,
-            "prop": "extracts",
-            "exintro": "true",
-            "explaintext": "true",
-            "redirects": 1,
-        }
+# Set from --nocache so regression runs always hit the network
+USE_WIKI_CACHE = True
 
-        url = f"{search_url}?{urllib.parse.urlencode(content_params)}"
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read().decode())
+@functools.lru_cache(maxsize=512)
+def _fetch_cached(search_query: str) -> dict:
+    """Fetch a Wikipedia intro; results are memoized per normalized query"""
+    # Search for the most relevant article and fetch its intro in one
+    # round trip using the search generator
+    params = {
+        "action": "query",
+        "format": "json",
+        "generator": "search",
+        "gsrsearch": search_query,
+        "gsrlimit": 1,
+        "prop": "extracts",
+        "exintro": "true",
+        "explaintext": "true",
+        # Only the first 500 chars are shown; cap the extract server-side
+        # just above that so long intros aren't transferred in full
+        "exchars": 600,
+        "redirects": 1,
+    }
 
-        pages = data["query"]["pages"]
-        page_id = list(pages.keys())[0]
+    data = orjson.loads(_WIKI.get(WIKI_API_URL, params=params, timeout=10).content)
 
-        if page_id == "-1":
-            return {
-                "status": "error",
-                "message": f"No Wikipedia article found for '{search_query}'",
-            }
+    if "query" not in data:
+        return {
+            "status": "error",
+            "message": f"No Wikipedia article found for '{search_query}'",
+        }
 
-        content = pages[page_id]["extract"].strip()
+    pages = data["query"]["pages"]
+    page_id = list(pages.keys())[0]
+
+    if page_id == "-1":
         return {
-            "status": "success",
-            "content": content[:500] + "..." if len(content) > 500 else content,  # Truncate for readability
-            "title": pages[page_id]["title"],
+            "status": "error",
+            "message": f"No Wikipedia article found for '{search_query}'",
         }
 
+    content = pages[page_id]["extract"].strip()
+    return {
+        "status": "success",
+        "content": content[:500] + "..." if len(content) > 500 else content,  # Truncate for readability
+        "title": pages[page_id]["title"],
+    }
+
+def fetch_wikipedia_content(search_query: str) -> dict:
+    """Fetches wikipedia content for a given search_query"""
+    try:
+        query = search_query.strip().lower()
+        if not USE_WIKI_CACHE:
+            return _fetch_cached.__wrapped__(query)
+        # Hand out a copy so callers can't mutate the cached entry;
+        # exceptions propagate out of the cache and are never memoized
+        return dict(_fetch_cached(query))
+
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -114,6 +133,10 @@ def test_multiturn_conversation():
         }
     ]
     
+    # One id for the whole conversation lets a prefix-caching backend reuse
+    # its KV cache across turns; backends without support ignore the header
+    conversation_headers = {"X-Conversation-Id": uuid.uuid4().hex[:16]}
+    
     # Simulate multi-turn conversation
     conversation_turns = [
         "tell me about lee jae myung",
@@ -132,55 +155,56 @@ def test_multiturn_conversation():
             # Get response from model
             response = client.chat.completions.create(
                 model=MODEL,
+                extra_headers=conversation_headers,
                 messages=messages,
                 tools=[WIKI_TOOL],
             )
             
-            print(f"Response content: {response.choices[0].message.content}")
-            print(f"Has tool calls: {bool(response.choices[0].message.tool_calls)}")
+            message = response.choices[0].message
+            # Plain-dict copy for the history, so no SDK objects are kept
+            # around or re-walked when the next request is serialized
+            message_dict = message.model_dump(exclude_none=True)
 
-            if response.choices[0].message.tool_calls:
+            print(f"Response content: {message.content}")
+            print(f"Has tool calls: {bool(message.tool_calls)}")
+
+            if message.tool_calls:
                 print("✅ Tool calls detected!")
                 
                 # Handle tool calls exactly like lmstudio-tooluse-test.py
-                tool_calls = response.choices[0].message.tool_calls
+                tool_calls = message.tool_calls
 
                 # Add assistant message with tool calls
-                messages.append(
-                    {
-                        "role": "assistant",
-                        "tool_calls": [
-                            {
-                                "id": tool_call.id,
-                                "type": tool_call.type,
-                                "function": tool_call.function,
-                            }
-                            for tool_call in tool_calls
-                        ],
-                    }
-                )
+                messages.append(message_dict)
 
-                # Process each tool call and add results
-                for tool_call in tool_calls:
-                    args = json.loads(tool_call.function.arguments)
-                    result = fetch_wikipedia_content(args["search_query"])
+                # Terminal width is loop-invariant; query it once per turn
+                terminal_width = min(shutil.get_terminal_size().columns, 80)
+                sep = "=" * terminal_width
+                dash = "-" * terminal_width
+
+                # Resolve all tool calls concurrently; map() keeps results in
+                # tool_call order so tool_call_ids line up below
+                queries = [orjson.loads(tc.function.arguments)["search_query"] for tc in tool_calls]
+                with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                    results = list(executor.map(fetch_wikipedia_content, queries))
 
+                # Process each tool call and add results
+                for tool_call, result in zip(tool_calls, results):
                     # Print the Wikipedia content
-                    terminal_width = min(shutil.get_terminal_size().columns, 80)
-                    print("\n" + "=" * terminal_width)
+                    print("\n" + sep)
                     if result["status"] == "success":
                         print(f"Wikipedia article: {result['title']}")
-                        print("-" * terminal_width)
+                        print(dash)
                         print(result["content"])
                     else:
                         print(f"Error: {result['message']}")
-                    print("=" * terminal_width)
+                    print(sep)
 
                     # Add tool result to conversation
                     messages.append(
                         {
                             "role": "tool",
-                            "content": json.dumps(result),
+                            "content": orjson.dumps(result).decode(),
                             "tool_call_id": tool_call.id,
                         }
                     )
@@ -188,7 +212,8 @@ def test_multiturn_conversation():
                 # Get the post-tool-call response (NON-STREAMING for now)
                 print("\nGetting final response (non-streaming)...")
                 final_response = client.chat.completions.create(
-                    model=MODEL, 
+                    model=MODEL,
+                    extra_headers=conversation_headers,
                     messages=messages
                 )
                 
@@ -206,13 +231,8 @@ def test_multiturn_conversation():
             else:
                 # Handle regular response (no tool calls)
                 print("Regular response (no tool calls)")
-                print(f"Assistant: {response.choices[0].message.content}")
-                messages.append(
-                    {
-                        "role": "assistant",
-                        "content": response.choices[0].message.content,
-                    }
-                )
+                print(f"Assistant: {message.content}")
+                messages.append(message_dict)
             
             print(f"\nConversation length: {len(messages)} messages")
             
@@ -227,6 +247,11 @@ def test_multiturn_conversation():
     return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nocache", action="store_true",
+                        help="bypass the Wikipedia result cache")
+    USE_WIKI_CACHE = not parser.parse_args().nocache
+
     success = test_multiturn_conversation()
     
     if success:
@@ -170,7 +170,7 @@ def process_turn_with_streaming(messages, user_input, turn_num):
             
             print("Assistant (streaming): ", end="", flush=True)
             
-            collected_content = ""
+            content_parts = []
             chunk_count = 0
             
             for chunk in stream_response:
@@ -178,11 +178,12 @@ def process_turn_with_streaming(messages, user_input, turn_num):
                 if chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
                     print(content, end="", flush=True)
-                    collected_content += content
+                    content_parts.append(content)
                     
                 if chunk_count > 100:  # Safety limit per turn
                     print("\n[Truncated - too many chunks]")
                     break
+            collected_content = "".join(content_parts)
             
             print(f"\n[Streaming completed: {len(collected_content)} chars in {chunk_count} chunks]")
             
@@ -205,7 +206,7 @@ def process_turn_with_streaming(messages, user_input, turn_num):
             
             print("Assistant (streaming): ", end="", flush=True)
             
-            collected_content = ""
+            content_parts = []
             chunk_count = 0
             
             for chunk in stream_response:
@@ -213,11 +214,12 @@ def process_turn_with_streaming(messages, user_input, turn_num):
                 if chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
                     print(content, end="", flush=True)
-                    collected_content += content
+                    content_parts.append(content)
                     
                 if chunk_count > 100:  # Safety limit
                     print("\n[Truncated - too many chunks]")
                     break
+            collected_content = "".join(content_parts)
             
             print(f"\n[Streaming completed: {len(collected_content)} chars in {chunk_count} chunks]")
             
@@ -6,6 +6,8 @@ Tests tool call conversion and API forwarding
 
 import json
 import requests
+import statistics
+import time
 import unittest
 from unittest.mock import patch, Mock
 import sys
@@ -15,12 +17,13 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import ToolCallConverter, ProxyHandler
+from config import Config
 
 class TestToolCallConverter(unittest.TestCase):
     """Test the ToolCallConverter class"""
     
     def setUp(self):
-        self.converter = ToolCallConverter()
+        self.converter = ToolCallConverter
     
     def test_parse_glm_tool_calls_single(self):
         """Test parsing single GLM tool call"""
@@ -134,6 +137,143 @@ I'll fetch information about Kyungju city.
         # Should be unchanged
         self.assertEqual(converted, standard_response)
 
+class TestProxyHandler(unittest.TestCase):
+    """Test request forwarding through the Flask app"""
+
+    def setUp(self):
+        from app import app
+        self.client = app.test_client()
+
+    def _upstream(self, lines, produced):
+        """Mock backend response whose lines are recorded as they are read"""
+        def iter_lines(decode_unicode=False):
+            for line in lines:
+                produced.append(line)
+                yield line
+
+        upstream = Mock()
+        upstream.status_code = 200
+        upstream.iter_lines = iter_lines
+        return upstream
+
+    def test_first_delta_relayed_before_upstream_finishes(self):
+        """Test the first SSE frame reaches the client before the stream ends"""
+        chunk = {"id": "chatcmpl-1", "model": "gpt-4", "choices": [{"index": 0, "delta": {"content": "Hi"}}]}
+        lines = [f"data: {json.dumps(chunk)}".encode(), b"", f"data: {json.dumps(chunk)}".encode(), b"", b"data: [DONE]"]
+        produced = []
+
+        with patch('app.requests.request', return_value=self._upstream(lines, produced)):
+            response = self.client.post(
+                '/v1/chat/completions',
+                json={"model": "gpt-4", "stream": True, "messages": []},
+                buffered=False,
+            )
+            self.assertEqual(response.headers['X-Accel-Buffering'], 'no')
+
+            first = next(iter(response.response))
+            self.assertIn(b'"Hi"', first if isinstance(first, bytes) else first.encode())
+            self.assertLess(len(produced), len(lines))
+            response.close()
+
+    def test_catch_all_relays_body_lazily(self):
+        """Test the catch-all route streams the backend body instead of buffering it"""
+        blocks = [b'{"data": [', b'{"id": "a"},', b'{"id": "b"}', b']}']
+        produced = []
+
+        def iter_content(chunk_size=1):
+            for block in blocks:
+                produced.append(block)
+                yield block
+
+        upstream = Mock()
+        upstream.status_code = 200
+        upstream.raw.headers = {'Content-Type': 'application/json', 'Content-Length': '42'}
+        upstream.iter_content = iter_content
+
+        with patch('app.requests.request', return_value=upstream) as backend:
+            response = self.client.get('/v1/models', buffered=False)
+            self.assertTrue(backend.call_args.kwargs['stream'])
+            self.assertNotIn('Content-Length', response.headers)
+
+            first = next(iter(response.response))
+            self.assertEqual(first, blocks[0])
+            self.assertEqual(len(produced), 1)
+            response.close()
+
+    def test_regular_response_keeps_wide_integers(self):
+        """Test integers wider than 64 bits in a backend response stay exact"""
+        upstream = Mock()
+        upstream.status_code = 200
+        upstream.content = b'{"model": "gpt-4", "choices": [], "seed": %d}' % (2**70 + 1)
+        upstream.headers = {}
+
+        with patch('app.requests.request', return_value=upstream):
+            response = self.client.post('/v1/chat/completions', json={"model": "gpt-4", "messages": []})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['seed'], 2**70 + 1)
+
+    @patch('app.config.ENABLE_CONVERSATION_ID', True)
+    def test_conversation_id_stable_across_turns(self):
+        """Test every turn of a conversation gets the same X-Conversation-Id"""
+        upstream = Mock()
+        upstream.status_code = 200
+        upstream.content = b'{"model": "gpt-4", "choices": []}'
+        upstream.headers = {}
+        opening = [{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}]
+        turns = [
+            opening,
+            opening + [{"role": "assistant", "content": "hello"}, {"role": "user", "content": "more"}],
+            [{"role": "system", "content": "sys"}, {"role": "user", "content": "another topic"}],
+        ]
+
+        sent_ids = []
+        for messages in turns:
+            with patch('app.requests.request', return_value=upstream) as backend:
+                self.client.post('/v1/chat/completions', json={"model": "gpt-4", "messages": messages})
+                sent_ids.append(backend.call_args.kwargs['headers'].get('X-Conversation-Id'))
+
+        self.assertIsNotNone(sent_ids[0])
+        self.assertEqual(sent_ids[0], sent_ids[1])
+        self.assertNotEqual(sent_ids[0], sent_ids[2])
+
+    @patch('app.config.ENABLE_CONVERSATION_ID', True)
+    def test_conversation_id_skipped_for_malformed_messages(self):
+        """Test a non-list messages field is still forwarded to the backend"""
+        upstream = Mock()
+        upstream.status_code = 400
+        upstream.content = b'{"error": "messages must be an array"}'
+        upstream.headers = {}
+
+        for messages in ({"role": "user"}, "hi"):
+            with patch('app.requests.request', return_value=upstream) as backend:
+                response = self.client.post('/v1/chat/completions', json={"model": "gpt-4", "messages": messages})
+                backend.assert_called_once()
+                self.assertNotIn('X-Conversation-Id', backend.call_args.kwargs['headers'])
+                self.assertEqual(response.status_code, 400)
+
+    @patch('app.config.ENABLE_CONVERSATION_ID', True)
+    def test_conversation_id_skipped_for_unserializable_opening(self):
+        """Test an opening orjson can't hash is still forwarded to the backend"""
+        upstream = Mock()
+        upstream.status_code = 200
+        upstream.content = b'{"model": "gpt-4", "choices": []}'
+        upstream.headers = {}
+        # Valid JSON, but wider than the 64-bit integers orjson serializes
+        body = '{"model": "gpt-4", "messages": [{"role": "user", "content": "hi", "seed": %d}]}' % 2**70
+
+        with patch('app.requests.request', return_value=upstream) as backend:
+            response = self.client.post('/v1/chat/completions', data=body, content_type='application/json')
+            backend.assert_called_once()
+            self.assertNotIn('X-Conversation-Id', backend.call_args.kwargs['headers'])
+            self.assertEqual(response.status_code, 200)
+
+    def test_conversation_id_off_by_default(self):
+        """Test X-Conversation-Id is opt-in"""
+        with patch.dict(os.environ):
+            os.environ.pop('ENABLE_CONVERSATION_ID', None)
+            self.assertFalse(Config().ENABLE_CONVERSATION_ID)
+
 def test_proxy_server():
     """Test proxy server functionality"""
     print("\n=== Testing Proxy Server ===")
@@ -191,6 +331,58 @@ def test_proxy_server():
     
     return True
 
+def _stream_arrival_times(url, payload):
+    """Return the arrival time of each SSE data line streamed from url"""
+    times = []
+    with requests.post(url, json=payload, stream=True, timeout=60) as response:
+        for line in response.iter_lines():
+            if line.startswith(b"data: ") and line != b"data: [DONE]":
+                times.append(time.perf_counter())
+    return times
+
+def check_streaming_latency():
+    """Check streamed deltas are not buffered by the proxy
+
+    The same request is streamed straight from the backend and through the
+    proxy. A proxy that buffers delivers every delta at once, so the time
+    between the first and last delta collapses compared to the backend's.
+    Time to first token is not compared, since it is dominated by prompt
+    prefill and varies between runs. Not collected by pytest: it needs a
+    live proxy and backend.
+    """
+    print("\n=== Testing Streaming Latency ===")
+    
+    proxy_url = "http://localhost:5000/v1/chat/completions"
+    backend_url = "http://localhost:8888/v1/chat/completions"
+    test_request = {
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "stream": True,
+        "messages": [
+            {"role": "user", "content": "Count from one to twenty in words."}
+        ]
+    }
+    
+    try:
+        backend_times = _stream_arrival_times(backend_url, test_request)
+        proxy_times = _stream_arrival_times(proxy_url, test_request)
+    except requests.RequestException as e:
+        print(f"Streaming latency test failed: {e}")
+        return False
+    
+    if len(backend_times) < 3 or len(proxy_times) < 3:
+        print(f"Not enough streamed chunks to measure: backend {len(backend_times)}, proxy {len(proxy_times)}")
+        return False
+    
+    backend_spread = backend_times[-1] - backend_times[0]
+    proxy_spread = proxy_times[-1] - proxy_times[0]
+    proxy_gap = statistics.median(proxy_times[i] - proxy_times[i - 1] for i in range(1, len(proxy_times)))
+    print(f"Backend: {len(backend_times)} chunks over {backend_spread * 1000:.1f} ms")
+    print(f"Proxy:   {len(proxy_times)} chunks over {proxy_spread * 1000:.1f} ms, median gap {proxy_gap * 1000:.1f} ms")
+    
+    # Generation speed varies between runs, so only a collapse is flagged
+    assert proxy_spread > backend_spread * 0.5, "Deltas arrived bunched together; proxy may be buffering"
+    return True
+
 if __name__ == '__main__':
     print("Running unit tests...")
     unittest.main(argv=[''], exit=False, verbosity=2)
@@ -201,4 +393,5 @@ if __name__ == '__main__':
     print("and the backend API is running on port 8888")
     
     input("Press Enter to continue with integration tests...")
-    test_proxy_server()
\ No newline at end of file
+    test_proxy_server()
+    check_streaming_latency()
\ No newline at end of file
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import re
+import timeit
+from converters.glm import GLMToolCallConverter
 
 # Original GLM format from your example
 content = """
@@ -39,4 +41,56 @@ print(f"Simple matches: {len(matches)}")
 for match in matches:
     print(f"  Function: '{match[0].strip()}'")
     print(f"  Key: '{match[1].strip()}'")
-    print(f"  Value: '{match[2].strip()}'")
\ No newline at end of file
+    print(f"  Value: '{match[2].strip()}'")
+
+# The regex pair GLMToolCallConverter used before the single-pass scanner
+LEGACY_PATTERN = r'<tool_call>\s*(.*?)\s*((?:<arg_key>.*?</arg_key>\s*<arg_value>.*?</arg_value>\s*)+)\s*</tool_call>'
+ARG_PATTERN = r'<arg_key>\s*(.*?)\s*</arg_key>\s*<arg_value>\s*(.*?)\s*</arg_value>'
+
+def regex_legacy_matches(text):
+    """Parse legacy blocks with the old regexes, in the scanner's result shape"""
+    return [
+        (name.strip(), [(key.strip(), value.strip()) for key, value in re.findall(ARG_PATTERN, args, re.DOTALL)])
+        for name, args in re.findall(LEGACY_PATTERN, text, re.DOTALL)
+    ]
+
+def test_scanner_matches_regex():
+    """The legacy tool_call scanner agrees with the old regexes"""
+    converter = GLMToolCallConverter()
+    samples = [
+        content,
+        simple_content,
+        "no tool calls here",
+        "<tool_call>get_time\n<arg_key>tz</arg_key>\n<arg_value>UTC</arg_value>\n</tool_call>"
+        "text between<tool_call>search\n<arg_key>q</arg_key><arg_value>a b</arg_value>"
+        "<arg_key>limit</arg_key>\n<arg_value>3</arg_value>\n</tool_call>",
+        "<tool_call>unterminated\n<arg_key>q</arg_key>\n<arg_value>x</arg_value>",
+    ]
+    for text in samples:
+        assert converter._scan_legacy_tool_calls(text) == regex_legacy_matches(text), text
+
+def test_scanner_skips_argless_block():
+    """An argument-less block no longer merges into the next block's name"""
+    converter = GLMToolCallConverter()
+    text = "<tool_call>noop</tool_call>\n" + simple_content
+
+    # The lazy regex runs past the first </tool_call> into the next block
+    assert regex_legacy_matches(text)[0][0] == "noop</tool_call>\n<tool_call>fetch_wikipedia_content"
+    assert converter._scan_legacy_tool_calls(text) == [
+        ("fetch_wikipedia_content", [("search_query", "Kyungju Korea")])
+    ]
+
+if __name__ == "__main__":
+    # Benchmark the legacy regex against the converter's single-pass scanner
+    converter = GLMToolCallConverter()
+    long_content = ("Some reasoning text before the call. " * 50 + simple_content + "\n") * 100
+
+    regex_matches = re.findall(LEGACY_PATTERN, long_content, re.DOTALL)
+    scan_matches = converter._scan_legacy_tool_calls(long_content)
+    print(f"\nBenchmark content: {len(long_content)} chars")
+    print(f"Regex matches: {len(regex_matches)}, scanner matches: {len(scan_matches)}")
+
+    regex_time = timeit.timeit(lambda: re.findall(LEGACY_PATTERN, long_content, re.DOTALL), number=20)
+    scan_time = timeit.timeit(lambda: converter._scan_legacy_tool_calls(long_content), number=20)
+    print(f"Regex:   {regex_time * 1000 / 20:.3f} ms/call")
+    print(f"Scanner: {scan_time * 1000 / 20:.3f} ms/call")
@@ -3,16 +3,39 @@
 Test simple streaming without tool calls
 """
 
+import atexit
+import itertools
+import json
+import socket
+import sys
+import time
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from openai import OpenAI
 
+# Shared keep-alive clients so every request reuses pooled connections
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+atexit.register(SESSION.close)
+
+_http = httpx.Client(
+    timeout=300,
+    limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=90),
+)
+atexit.register(_http.close)
+client = OpenAI(base_url="http://127.0.0.1:5000", api_key="lm-studio", http_client=_http)
+
+# Streamed deltas are flushed to the terminal every N chunks or on newline
+FLUSH_EVERY = 8
+# Safety limit on the number of streamed chunks read per response
+MAX_STREAM_CHUNKS = 100
+
 def test_simple_streaming():
     """Test basic streaming without any tool calls"""
     print("Testing Simple Streaming (No Tool Calls)")
     print("=" * 40)
     
-    client = OpenAI(base_url="http://127.0.0.1:5000", api_key="lm-studio")
-    
     try:
         print("Testing simple streaming request...")
         stream_response = client.chat.completions.create(
@@ -26,19 +49,28 @@ def test_simple_streaming():
         print("✅ Streaming request successful")
         print("Response chunks:")
         
-        collected_content = ""
+        content_parts = []
         chunk_count = 0
         
-        for chunk in stream_response:
-            chunk_count += 1
-            if chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
-                print(content, end="", flush=True)
-                collected_content += content
-            
-            if chunk_count > 100:  # Safety limit
-                print("\n[Truncated - too many chunks]")
+        # islice enforces the safety limit and enumerate does the counting
+        for chunk_count, chunk in enumerate(itertools.islice(stream_response, MAX_STREAM_CHUNKS + 1), 1):
+            # The extra chunk is only fetched to tell a capped stream from one
+            # that ended exactly at the limit
+            if chunk_count > MAX_STREAM_CHUNKS:
                 break
+            content = chunk.choices[0].delta.content
+            if content:
+                sys.stdout.write(content)
+                content_parts.append(content)
+                # Flush in batches instead of once per token
+                if chunk_count % FLUSH_EVERY == 0 or "\n" in content:
+                    sys.stdout.flush()
+        
+        if chunk_count > MAX_STREAM_CHUNKS:
+            chunk_count = MAX_STREAM_CHUNKS
+            print("\n[Truncated - too many chunks]")
+        
+        collected_content = "".join(content_parts)
         
         print(f"\n\nSimple streaming works! ({chunk_count} chunks, {len(collected_content)} chars)")
         return True
@@ -47,6 +79,22 @@ def test_simple_streaming():
         print(f"❌ Simple streaming failed: {e}")
         return False
 
+def iter_sse_frames(response):
+    """Yield raw SSE frames split on the blank-line boundary, without decoding"""
+    buf = bytearray()
+    for block in response.iter_content(chunk_size=8192):
+        buf += block
+        while True:
+            end = buf.find(b"\n\n")
+            if end < 0:
+                break
+            # Extra blank lines between events leave leading newlines behind
+            frame = bytes(buf[:end]).lstrip(b"\r\n")
+            del buf[:end + 2]
+            # Skip empty and comment frames such as keep-alive pings
+            if frame and not frame.startswith(b":"):
+                yield frame
+
 def test_raw_streaming():
     """Test raw HTTP streaming request"""
     print("\n" + "=" * 40)
@@ -54,7 +102,9 @@ def test_raw_streaming():
     print("=" * 40)
     
     try:
-        response = requests.post(
+        # Closing the response returns its connection to the shared pool,
+        # including when the loop below stops reading early
+        with SESSION.post(
             "http://localhost:5000/v1/chat/completions",
             json={
                 "model": "glm-4.5-air-hi-mlx@4bit",
@@ -65,39 +115,119 @@ def test_raw_streaming():
             },
             stream=True,
             timeout=30
-        )
-        
-        print(f"Raw streaming status: {response.status_code}")
-        print(f"Headers: {dict(response.headers)}")
-        
-        if response.status_code == 200:
-            print("✅ Raw streaming works")
-            chunk_count = 0
-            for line in response.iter_lines(decode_unicode=True):
-                chunk_count += 1
-                print(f"Line {chunk_count}: {line}")
-                
-                if chunk_count > 10:  # Just show first few lines
-                    print("...[truncated]")
-                    break
+        ) as response:
+            print(f"Raw streaming status: {response.status_code}")
+            print(f"Headers: {dict(response.headers)}")
             
-            return True
-        else:
-            print(f"❌ Raw streaming failed: {response.text}")
-            return False
+            if response.status_code == 200:
+                print("✅ Raw streaming works")
+                chunk_count = 0
+                for frame in iter_sse_frames(response):
+                    chunk_count += 1
+                    print(f"Frame {chunk_count}: {frame.decode('utf-8', 'replace')}")
+                    
+                    if chunk_count > 10:  # Just show first few frames
+                        print("...[truncated]")
+                        break
+                
+                return True
+            else:
+                print(f"❌ Raw streaming failed: {response.text}")
+                return False
             
     except Exception as e:
         print(f"❌ Raw streaming error: {e}")
         return False
 
+def decode_chunked(body: bytes) -> bytes:
+    """Decode an HTTP/1.1 chunked transfer-encoded body"""
+    out = bytearray()
+    pos = 0
+    while True:
+        eol = body.index(b"\r\n", pos)
+        size = int(body[pos:eol].split(b";", 1)[0], 16)
+        if size == 0:
+            return bytes(out)
+        start = eol + 2
+        out += body[start:start + size]
+        pos = start + size + 2
+
+def test_socket_streaming():
+    """Read an SSE stream over a raw socket alongside the requests-based path
+
+    The request is framed by hand and the connection is closed by the
+    server at the end of the stream, so the reader only has to undo chunked
+    transfer encoding. Each path runs its own model generation, so the two
+    timings are end-to-end times and their difference is dominated by
+    generation variance, not client-side overhead.
+    """
+    print("\n" + "=" * 40)
+    print("Testing Raw Socket Streaming")
+    print("=" * 40)
+    
+    payload = {
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "messages": [
+            {"role": "user", "content": "Say hello"}
+        ],
+        "stream": True
+    }
+    body = json.dumps(payload).encode()
+    request = (
+        b"POST /v1/chat/completions HTTP/1.1\r\n"
+        b"Host: 127.0.0.1:5000\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: %d\r\n"
+        b"Connection: close\r\n"
+        b"\r\n" % len(body)
+    ) + body
+    
+    try:
+        start = time.perf_counter()
+        with socket.create_connection(("127.0.0.1", 5000), timeout=30) as sock:
+            sock.sendall(request)
+            buf = bytearray()
+            while True:
+                block = sock.recv(65536)
+                if not block:
+                    break
+                buf += block
+        socket_elapsed = time.perf_counter() - start
+        
+        head, _, sse = bytes(buf).partition(b"\r\n\r\n")
+        status_line, _, headers = head.partition(b"\r\n")
+        print(f"Socket streaming status: {status_line.decode()}")
+        if b"transfer-encoding: chunked" in headers.lower():
+            sse = decode_chunked(sse)
+        if status_line.split()[1] != b"200":
+            print(f"❌ Socket streaming failed: {sse[:200]!r}")
+            return False
+        socket_frames = sum(1 for frame in sse.split(b"\n\n") if frame.lstrip(b"\r\n").startswith(b"data: "))
+        
+        start = time.perf_counter()
+        with SESSION.post("http://127.0.0.1:5000/v1/chat/completions", json=payload, stream=True, timeout=30) as response:
+            requests_frames = sum(1 for frame in iter_sse_frames(response) if frame.startswith(b"data: "))
+        requests_elapsed = time.perf_counter() - start
+        
+        print(f"socket:   {socket_frames} frames in {socket_elapsed * 1000:.1f} ms end-to-end")
+        print(f"requests: {requests_frames} frames in {requests_elapsed * 1000:.1f} ms end-to-end")
+        print("✅ Socket streaming works")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Socket streaming error: {e}")
+        return False
+
 def main():
     simple_works = test_simple_streaming()
     raw_works = test_raw_streaming()
+    socket_works = test_socket_streaming()
     
     print("\n" + "=" * 40)
     print("Results:")
     print(f"Simple Streaming: {'✅ WORKS' if simple_works else '❌ FAILED'}")
     print(f"Raw HTTP Streaming: {'✅ WORKS' if raw_works else '❌ FAILED'}")
+    print(f"Raw Socket Streaming: {'✅ WORKS' if socket_works else '❌ FAILED'}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
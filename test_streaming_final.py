@@ -3,79 +3,103 @@
 Final streaming test - exact scenario from lmstudio-tooluse-test.py
 """
 
+import asyncio
+import atexit
+import functools
 import json
 import shutil
-from openai import OpenAI
+import sys
+from types import MappingProxyType
+from typing import Tuple
+import httpx
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from openai import AsyncOpenAI
 
-# Initialize client (using proxy server)
-client = OpenAI(base_url="http://127.0.0.1:5000", api_key="lm-studio")
+BASE_URL = "http://127.0.0.1:5000"
 MODEL = "glm-4.5-air-hi-mlx@4bit"
 
-def fetch_wikipedia_content(search_query: str) -> dict:
-    """Fetches wikipedia content for a given search_query"""
-    try:
-        import urllib.parse
-        import urllib.request
-        
-        # Search for most relevant article
-        search_url = "https://en.wikipedia.org/w/api.php"
-        search_params = {
-            "action": "query",
-            "format": "json",
-            "list": "search",
-            "srsearch": search_query,
-            "srlimit": 1,
-        }
+# Streamed deltas are flushed to the terminal every N chunks or on newline
+FLUSH_EVERY = 8
+# Safety limit on the number of streamed chunks read per response
+MAX_STREAM_CHUNKS = 200
 
-        url = f"{search_url}?{urllib.parse.urlencode(search_params)}"
-        with urllib.request.urlopen(url) as response:
-            search_data = json.loads(response.read().decode())
-
-        if not search_data["query"]["search"]:
-            return {
-                "status": "error",
-                "message": f"No Wikipedia article found for '{search_query}'",
-            }
-
-        # Get the normalized title from search results
-        normalized_title = search_data["query"]["search"][0]["title"]
-
-        # Now fetch the actual content with the normalized title
-        content_params = {
-            "action": "query",
-            "format": "json",
-            "titles": normalized_title,
-            "prop": "extracts",
-            "exintro": "true",
-            "explaintext": "true",
-            "redirects": 1,
-        }
+# Shared keep-alive session so every tool call reuses pooled TLS
+# connections to en.wikipedia.org
+WIKI_API_URL = "https://en.wikipedia.org/w/api.php"
+_WIKI = requests.Session()
+_WIKI.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+atexit.register(_WIKI.close)
+
+@functools.lru_cache(maxsize=128)
+def _fetch_cached(search_query: str) -> dict:
+    """Fetch a Wikipedia intro, memoized per query for the process"""
+    # Search for the most relevant article and fetch its intro in one
+    # round trip using the search generator
+    params = {
+        "action": "query",
+        "format": "json",
+        "generator": "search",
+        "gsrsearch": search_query,
+        "gsrlimit": 1,
+        "prop": "extracts",
+        "exintro": "true",
+        "explaintext": "true",
+        "redirects": 1,
+    }
 
-        url = f"{search_url}?{urllib.parse.urlencode(content_params)}"
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read().decode())
+    data = _WIKI.get(WIKI_API_URL, params=params, timeout=10).json()
 
-        pages = data["query"]["pages"]
-        page_id = list(pages.keys())[0]
+    if "query" not in data:
+        return {
+            "status": "error",
+            "message": f"No Wikipedia article found for '{search_query}'",
+        }
 
-        if page_id == "-1":
-            return {
-                "status": "error",
-                "message": f"No Wikipedia article found for '{search_query}'",
-            }
+    pages = data["query"]["pages"]
+    page_id = list(pages.keys())[0]
 
-        content = pages[page_id]["extract"].strip()
+    if page_id == "-1":
         return {
-            "status": "success",
-            "content": content[:500] + "..." if len(content) > 500 else content,  # Truncate for readability
-            "title": pages[page_id]["title"],
+            "status": "error",
+            "message": f"No Wikipedia article found for '{search_query}'",
         }
 
+    content = pages[page_id]["extract"].strip()
+    result = {
+        "status": "success",
+        "content": content[:500] + "..." if len(content) > 500 else content,  # Truncate for readability
+        "title": pages[page_id]["title"],
+    }
+    return result
+
+def fetch_wikipedia_content(search_query: str) -> dict:
+    """Fetches wikipedia content for a given search_query"""
+    try:
+        # Hand out a copy so callers can't mutate the cached entry;
+        # exceptions propagate out of the cache and are never memoized
+        return dict(_fetch_cached(search_query))
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-# Define tool for LM Studio
-WIKI_TOOL = {
+@functools.lru_cache(maxsize=64)
+def _result_json(search_query: str) -> str:
+    """Serialized tool result for a query, memoized alongside the fetch"""
+    return orjson.dumps(_fetch_cached(search_query)).decode()
+
+def fetch_wikipedia_content_json(search_query: str) -> Tuple[dict, str]:
+    """Fetch a tool result together with its JSON serialization"""
+    result = fetch_wikipedia_content(search_query)
+    if result["status"] == "success":
+        # Errors may come from an exception that was never memoized, so
+        # only successes reuse the cached serialization
+        return result, _result_json(search_query)
+    return result, orjson.dumps(result).decode()
+
+# Define tool for LM Studio; frozen so test runs can't mutate the shared
+# definition, and passed as a prebuilt tuple instead of a fresh list per call
+WIKI_TOOL = MappingProxyType({
     "type": "function",
     "function": {
         "name": "fetch_wikipedia_content",
@@ -95,10 +119,50 @@ WIKI_TOOL = {
             "required": ["search_query"],
         },
     },
-}
+})
+_TOOLS = (WIKI_TOOL,)
 
 def test_full_streaming_scenario():
     """Test the exact streaming scenario from lmstudio-tooluse-test.py"""
+    return asyncio.run(full_streaming_scenario())
+
+async def enumerate_capped(stream, limit: int):
+    """Async counterpart of enumerate(islice(stream, limit), 1)
+
+    Keeps the safety limit and chunk counting out of the display loop body.
+    """
+    count = 0
+    async for item in stream:
+        count += 1
+        yield count, item
+        if count >= limit:
+            return
+
+async def prewarm(http_client: httpx.AsyncClient, connections: int = 2):
+    """Open keep-alive connections to the proxy ahead of the first real request
+
+    Concurrent health checks each take their own socket, so the pool has
+    ready connections and the handshake stays off the time-to-first-token path.
+    """
+    await asyncio.gather(
+        *(http_client.get(f"{BASE_URL}/health", timeout=2) for _ in range(connections)),
+        return_exceptions=True,
+    )
+
+async def full_streaming_scenario():
+    """Run the streaming scenario on a keep-alive async client
+
+    The async HTTP pool is bound to the event loop it is first used on,
+    so the clients are created inside the running loop rather than at import.
+    """
+    limits = httpx.Limits(max_keepalive_connections=10, keepalive_expiry=90)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as http_client:
+        client = AsyncOpenAI(base_url=BASE_URL, api_key="lm-studio", http_client=http_client)
+        await prewarm(http_client)
+        return await run_streaming_scenario(client, http_client)
+
+async def run_streaming_scenario(client: AsyncOpenAI, http_client: httpx.AsyncClient):
+    """Tool-call round trip followed by a streamed final answer"""
     print("Testing Full Streaming Scenario")
     print("=" * 50)
     
@@ -124,10 +188,10 @@ def test_full_streaming_scenario():
     try:
         # Get initial response (should include tool calls)
         print("\n1. Getting initial response with tool calls...")
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=MODEL,
             messages=messages,
-            tools=[WIKI_TOOL],
+            tools=_TOOLS,
         )
         
         print(f"Response content: {response.choices[0].message.content}")
@@ -154,34 +218,43 @@ def test_full_streaming_scenario():
                 }
             )
 
-            # Process each tool call and add results
-            for tool_call in tool_calls:
-                args = json.loads(tool_call.function.arguments)
-                result = fetch_wikipedia_content(args["search_query"])
+            # Fetch every tool result concurrently while a cheap request
+            # keeps the proxy connection warm for the streaming call
+            queries = [json.loads(tool_call.function.arguments)["search_query"] for tool_call in tool_calls]
+            *results, _ = await asyncio.gather(
+                *(asyncio.to_thread(fetch_wikipedia_content_json, query) for query in queries),
+                http_client.head(f"{BASE_URL}/health"),
+                return_exceptions=True,
+            )
 
+            # Process each tool call and add results
+            # Terminal size and rules are loop-invariant
+            terminal_width = min(shutil.get_terminal_size().columns, 80)
+            sep = "=" * terminal_width
+            dash = "-" * terminal_width
+            for tool_call, (result, result_json) in zip(tool_calls, results):
                 # Print the Wikipedia content
-                terminal_width = min(shutil.get_terminal_size().columns, 80)
-                print("\n" + "=" * terminal_width)
+                print("\n" + sep)
                 if result["status"] == "success":
                     print(f"Wikipedia article: {result['title']}")
-                    print("-" * terminal_width)
+                    print(dash)
                     print(result["content"])
                 else:
                     print(f"Error: {result['message']}")
-                print("=" * terminal_width)
+                print(sep)
 
                 # Add tool result to conversation
                 messages.append(
                     {
                         "role": "tool",
-                        "content": json.dumps(result),
+                        "content": result_json,
                         "tool_call_id": tool_call.id,
                     }
                 )
 
             # Get the post-tool-call response with STREAMING
             print("\n2. Getting final response with STREAMING...")
-            stream_response = client.chat.completions.create(
+            stream_response = await client.chat.completions.create(
                 model=MODEL, 
                 messages=messages,
                 stream=True  # This is the critical test!
@@ -190,19 +263,27 @@ def test_full_streaming_scenario():
             print("✅ Streaming request created successfully")
             print("Assistant (streaming): ", end="", flush=True)
             
-            collected_content = ""
+            content_parts = []
             chunk_count = 0
             
-            for chunk in stream_response:
-                chunk_count += 1
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    print(content, end="", flush=True)
-                    collected_content += content
-                    
-                if chunk_count > 200:  # Safety limit
-                    print("\n[Truncated - too many chunks]")
+            async for chunk_count, chunk in enumerate_capped(stream_response, MAX_STREAM_CHUNKS + 1):
+                # The extra chunk is only fetched to tell a capped stream from one
+                # that ended exactly at the limit
+                if chunk_count > MAX_STREAM_CHUNKS:
                     break
+                content = chunk.choices[0].delta.content
+                if content:
+                    sys.stdout.write(content)
+                    content_parts.append(content)
+                    # Flush in batches instead of once per token
+                    if chunk_count % FLUSH_EVERY == 0 or "\n" in content:
+                        sys.stdout.flush()
+            
+            if chunk_count > MAX_STREAM_CHUNKS:
+                chunk_count = MAX_STREAM_CHUNKS
+                print("\n[Truncated - too many chunks]")
+            
+            collected_content = "".join(content_parts)
             
             print(f"\n\n✅ Streaming completed successfully!")
             print(f"Total content: {len(collected_content)} characters in {chunk_count} chunks")
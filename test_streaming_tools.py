@@ -3,21 +3,190 @@
 Test streaming tool call conversion functionality
 """
 
-import json
-import requests
+import asyncio
+import os
+import httpx
+import orjson
 import time
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PROXY_URL = "http://localhost:5000/v1/chat/completions"
+# Set SLOW_STREAM=1 to send SSE frames one at a time with a delay between them
+SLOW_STREAM = bool(os.environ.get("SLOW_STREAM"))
+_mock_server_started = False
+
+# Simulated streaming chunks that build up to a tool call
+_TOOL_STREAM_CHUNKS = [
+    {
+        "id": "chatcmpl-stream-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"role": "assistant", "content": "I'll search for that information."},
+                "finish_reason": None
+            }
+        ]
+    },
+    {
+        "id": "chatcmpl-stream-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"content": "\n<tool_call>fetch_wikipedia_content"},
+                "finish_reason": None
+            }
+        ]
+    },
+    {
+        "id": "chatcmpl-stream-test",
+        "object": "chat.completion.chunk", 
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"content": "\n<arg_key>search_query</arg_key>"},
+                "finish_reason": None
+            }
+        ]
+    },
+    {
+        "id": "chatcmpl-stream-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"content": "\n<arg_value>Python programming</arg_value>\n</tool_call>"},
+                "finish_reason": None
+            }
+        ]
+    },
+    {
+        "id": "chatcmpl-stream-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {},
+                "finish_reason": "stop"
+            }
+        ]
+    }
+]
+
+_NORMAL_STREAM_CHUNKS = [
+    {
+        "id": "chatcmpl-stream-normal",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"role": "assistant", "content": "Hello! "},
+                "finish_reason": None
+            }
+        ]
+    },
+    {
+        "id": "chatcmpl-stream-normal",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"content": "How can I help you today?"},
+                "finish_reason": None
+            }
+        ]
+    },
+    {
+        "id": "chatcmpl-stream-normal",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "glm-4.5-air-hi-mlx@4bit",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {},
+                "finish_reason": "stop"
+            }
+        ]
+    }
+]
+
+# SSE frames are encoded once at import; only "created" is patched per response
+_CREATED_PLACEHOLDER = b'"created":0'
+
+def _encode_sse_frames(chunks):
+    """Encode chunks as SSE data frames followed by the [DONE] sentinel"""
+    return tuple(b"data: " + orjson.dumps(chunk) + b"\n\n" for chunk in chunks) + (b"data: [DONE]\n\n",)
+
+_TOOL_STREAM_FRAMES = _encode_sse_frames(_TOOL_STREAM_CHUNKS)
+_NORMAL_STREAM_FRAMES = _encode_sse_frames(_NORMAL_STREAM_CHUNKS)
+
+# Non-streaming responses, encoded once with the same "created" placeholder
+_NORMAL_TOOLS_BODY = orjson.dumps({
+    "id": "chatcmpl-normal-tools",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "glm-4.5-air-hi-mlx@4bit",
+    "choices": [
+        {
+            "index": 0,
+            "logprobs": None,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": "I'll search for that.\n<tool_call>fetch_wikipedia_content\n<arg_key>search_query</arg_key>\n<arg_value>Python programming</arg_value>\n</tool_call>"
+            }
+        }
+    ]
+})
+
+_NORMAL_BODY = orjson.dumps({
+    "id": "chatcmpl-normal",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "glm-4.5-air-hi-mlx@4bit",
+    "choices": [
+        {
+            "index": 0,
+            "logprobs": None,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": "Hello! How can I help you?"
+            }
+        }
+    ]
+})
 
 class MockStreamingGLMHandler(BaseHTTPRequestHandler):
     """Mock GLM backend that returns streaming responses with tool calls"""
     
+    # Set TCP_NODELAY on accepted sockets so each flushed SSE frame goes out
+    # immediately instead of waiting on Nagle/delayed-ACK interaction
+    disable_nagle_algorithm = True
+    
     def do_POST(self):
         if self.path == '/v1/chat/completions':
             # Read the request
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode('utf-8'))
+            request_data = orjson.loads(post_data)
             
             # Check if streaming and tools are requested
             is_streaming = request_data.get('stream', False)
@@ -41,83 +210,7 @@ class MockStreamingGLMHandler(BaseHTTPRequestHandler):
         self.send_header('Connection', 'keep-alive')
         self.end_headers()
         
-        # Simulate streaming chunks that build up to a tool call
-        chunks = [
-            {
-                "id": "chatcmpl-stream-test",
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {"role": "assistant", "content": "I'll search for that information."},
-                        "finish_reason": None
-                    }
-                ]
-            },
-            {
-                "id": "chatcmpl-stream-test",
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {"content": "\n<tool_call>fetch_wikipedia_content"},
-                        "finish_reason": None
-                    }
-                ]
-            },
-            {
-                "id": "chatcmpl-stream-test",
-                "object": "chat.completion.chunk", 
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {"content": "\n<arg_key>search_query</arg_key>"},
-                        "finish_reason": None
-                    }
-                ]
-            },
-            {
-                "id": "chatcmpl-stream-test",
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {"content": "\n<arg_value>Python programming</arg_value>\n</tool_call>"},
-                        "finish_reason": None
-                    }
-                ]
-            },
-            {
-                "id": "chatcmpl-stream-test",
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {},
-                        "finish_reason": "stop"
-                    }
-                ]
-            }
-        ]
-        
-        for chunk in chunks:
-            chunk_str = f"data: {json.dumps(chunk)}\n\n"
-            self.wfile.write(chunk_str.encode())
-            self.wfile.flush()
-            time.sleep(0.1)  # Small delay to simulate streaming
-        
-        self.wfile.write(b"data: [DONE]\n\n")
-        self.wfile.flush()
+        self._write_sse(_TOOL_STREAM_FRAMES)
     
     def _send_streaming_normal_response(self):
         """Send streaming response without tool calls"""
@@ -127,101 +220,30 @@ class MockStreamingGLMHandler(BaseHTTPRequestHandler):
         self.send_header('Connection', 'keep-alive')
         self.end_headers()
         
-        chunks = [
-            {
-                "id": "chatcmpl-stream-normal",
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {"role": "assistant", "content": "Hello! "},
-                        "finish_reason": None
-                    }
-                ]
-            },
-            {
-                "id": "chatcmpl-stream-normal",
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {"content": "How can I help you today?"},
-                        "finish_reason": None
-                    }
-                ]
-            },
-            {
-                "id": "chatcmpl-stream-normal",
-                "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "delta": {},
-                        "finish_reason": "stop"
-                    }
-                ]
-            }
-        ]
-        
-        for chunk in chunks:
-            chunk_str = f"data: {json.dumps(chunk)}\n\n"
-            self.wfile.write(chunk_str.encode())
-            self.wfile.flush()
-            time.sleep(0.1)
-        
-        self.wfile.write(b"data: [DONE]\n\n")
+        self._write_sse(_NORMAL_STREAM_FRAMES)
+    
+    def _write_sse(self, frames):
+        """Write pre-encoded SSE frames, coalesced into a single write unless SLOW_STREAM is set"""
+        created = b'"created":%d' % int(time.time())
+        if SLOW_STREAM:
+            for frame in frames:
+                self.wfile.write(frame.replace(_CREATED_PLACEHOLDER, created))
+                self.wfile.flush()
+                time.sleep(0.1)  # Small delay to simulate streaming
+        else:
+            self.wfile.write(b"".join(frames).replace(_CREATED_PLACEHOLDER, created))
         self.wfile.flush()
+        # The body has no length, so closing the connection ends the stream
+        self.close_connection = True
     
     def _send_normal_response(self, has_tools):
         """Send normal non-streaming response"""
-        if has_tools:
-            response = {
-                "id": "chatcmpl-normal-tools",
-                "object": "chat.completion",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "logprobs": None,
-                        "finish_reason": "stop",
-                        "message": {
-                            "role": "assistant",
-                            "content": "I'll search for that.\n<tool_call>fetch_wikipedia_content\n<arg_key>search_query</arg_key>\n<arg_value>Python programming</arg_value>\n</tool_call>"
-                        }
-                    }
-                ]
-            }
-        else:
-            response = {
-                "id": "chatcmpl-normal",
-                "object": "chat.completion",
-                "created": int(time.time()),
-                "model": "glm-4.5-air-hi-mlx@4bit",
-                "choices": [
-                    {
-                        "index": 0,
-                        "logprobs": None,
-                        "finish_reason": "stop",
-                        "message": {
-                            "role": "assistant",
-                            "content": "Hello! How can I help you?"
-                        }
-                    }
-                ]
-            }
+        body = _NORMAL_TOOLS_BODY if has_tools else _NORMAL_BODY
         
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
         self.end_headers()
-        response_str = json.dumps(response)
-        self.wfile.write(response_str.encode())
+        self.wfile.write(body.replace(_CREATED_PLACEHOLDER, b'"created":%d' % int(time.time())))
     
     def log_message(self, format, *args):
         # Suppress HTTP logs
@@ -229,18 +251,58 @@ class MockStreamingGLMHandler(BaseHTTPRequestHandler):
 
 def start_mock_server():
     """Start mock server on port 8888"""
-    server = HTTPServer(('localhost', 8888), MockStreamingGLMHandler)
+    # One thread per connection so concurrent test clients don't queue up;
+    # HTTPServer already sets SO_REUSEADDR so quick restarts skip TIME_WAIT
+    server = ThreadingHTTPServer(('localhost', 8888), MockStreamingGLMHandler)
     print("Mock streaming GLM server started on port 8888")
     server.serve_forever()
 
-def test_streaming_tool_calls():
-    """Test streaming tool call conversion"""
-    print("=== Testing Streaming Tool Call Conversion ===")
-    
-    # Start mock server
+def ensure_mock_server():
+    """Start the mock server thread once per process"""
+    global _mock_server_started
+    if _mock_server_started:
+        return
     server_thread = threading.Thread(target=start_mock_server, daemon=True)
     server_thread.start()
-    time.sleep(2)
+    
+    # Poll until the mock answers instead of sleeping a fixed interval;
+    # any HTTP response (even 501 for GET) means it is accepting connections
+    for _ in range(50):
+        try:
+            httpx.get("http://localhost:8888/", timeout=0.1)
+            break
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    _mock_server_started = True
+
+async def iter_sse_data(response: httpx.Response):
+    """Yield the payload of each SSE data frame as raw bytes
+
+    Frames are split on the blank-line boundary without decoding; comment
+    frames such as keep-alive pings are skipped.
+    """
+    buf = bytearray()
+    async for block in response.aiter_bytes():
+        buf += block
+        while True:
+            end = buf.find(b"\n\n")
+            if end < 0:
+                break
+            # Extra blank lines between events leave leading newlines behind
+            frame = bytes(buf[:end]).lstrip(b"\r\n")
+            del buf[:end + 2]
+            if frame.startswith(b"data: "):
+                yield frame[6:]
+
+async def run_streaming_tests(*tests):
+    """Run streaming checks concurrently on one pooled async client"""
+    limits = httpx.Limits(max_keepalive_connections=10)
+    async with httpx.AsyncClient(limits=limits) as client:
+        return await asyncio.gather(*(test(client) for test in tests))
+
+async def streaming_tool_calls(client: httpx.AsyncClient) -> bool:
+    """Stream a request with tools through the proxy and look for tool calls"""
+    print("=== Testing Streaming Tool Call Conversion ===")
     
     # Test streaming request with tools
     test_request = {
@@ -269,66 +331,59 @@ def test_streaming_tool_calls():
     
     try:
         print("Sending streaming request with tools...")
-        response = requests.post(
-            "http://localhost:5000/v1/chat/completions",
-            json=test_request,
-            stream=True,
-            timeout=30
-        )
-        
-        print(f"Response status: {response.status_code}")
-        
-        if response.status_code == 200:
+        async with client.stream("POST", PROXY_URL, json=test_request, timeout=30) as response:
+            print(f"Response status: {response.status_code}")
+            
+            if response.status_code != 200:
+                await response.aread()
+                print(f"❌ HTTP error: {response.status_code}")
+                print(f"Response: {response.text}")
+                return False
+            
             print("Streaming response chunks:")
             chunks_received = 0
             tool_calls_found = False
             
-            for line in response.iter_lines(decode_unicode=True):
-                if line.startswith('data: '):
-                    data = line[6:]
-                    if data.strip() == '[DONE]':
-                        print("Stream completed with [DONE]")
-                        break
+            async for data in iter_sse_data(response):
+                if data.strip() == b'[DONE]':
+                    print("Stream completed with [DONE]")
+                    break
+                
+                try:
+                    chunk = orjson.loads(data)
+                    chunks_received += 1
                     
-                    try:
-                        chunk = json.loads(data)
-                        chunks_received += 1
+                    if 'choices' in chunk and len(chunk['choices']) > 0:
+                        choice = chunk['choices'][0]
+                        delta = choice.get('delta', {})
                         
-                        if 'choices' in chunk and len(chunk['choices']) > 0:
-                            choice = chunk['choices'][0]
-                            delta = choice.get('delta', {})
-                            
-                            print(f"Chunk {chunks_received}:")
-                            if 'content' in delta and delta['content']:
-                                print(f"  Content: {repr(delta['content'])}")
-                            if 'tool_calls' in delta:
-                                print(f"  Tool calls: {delta['tool_calls']}")
-                                tool_calls_found = True
-                            if 'finish_reason' in choice and choice['finish_reason']:
-                                print(f"  Finish reason: {choice['finish_reason']}")
-                    
-                    except json.JSONDecodeError as e:
-                        print(f"Failed to parse chunk: {e}")
-                        print(f"Raw data: {data}")
-            
-            print(f"\nTotal chunks received: {chunks_received}")
-            if tool_calls_found:
-                print("✅ SUCCESS: Tool calls detected in streaming response!")
-                return True
-            else:
-                print("❌ FAILED: No tool calls found in streaming response")
-                return False
+                        print(f"Chunk {chunks_received}:")
+                        if 'content' in delta and delta['content']:
+                            print(f"  Content: {repr(delta['content'])}")
+                        if 'tool_calls' in delta:
+                            print(f"  Tool calls: {delta['tool_calls']}")
+                            tool_calls_found = True
+                        if 'finish_reason' in choice and choice['finish_reason']:
+                            print(f"  Finish reason: {choice['finish_reason']}")
+                
+                except orjson.JSONDecodeError as e:
+                    print(f"Failed to parse chunk: {e}")
+                    print(f"Raw data: {data!r}")
+        
+        print(f"\nTotal chunks received: {chunks_received}")
+        if tool_calls_found:
+            print("✅ SUCCESS: Tool calls detected in streaming response!")
+            return True
         else:
-            print(f"❌ HTTP error: {response.status_code}")
-            print(f"Response: {response.text}")
+            print("❌ FAILED: No tool calls found in streaming response")
             return False
             
     except Exception as e:
         print(f"❌ Test failed: {e}")
         return False
 
-def test_streaming_normal():
-    """Test streaming without tool calls"""
+async def streaming_normal(client: httpx.AsyncClient) -> bool:
+    """Stream a plain request through the proxy and collect its content"""
     print("\n=== Testing Streaming Normal Response ===")
     
     test_request = {
@@ -340,61 +395,63 @@ def test_streaming_normal():
     }
     
     try:
-        response = requests.post(
-            "http://localhost:5000/v1/chat/completions",
-            json=test_request,
-            stream=True,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
+        async with client.stream("POST", PROXY_URL, json=test_request, timeout=10) as response:
+            if response.status_code != 200:
+                print(f"❌ HTTP error: {response.status_code}")
+                return False
+            
             chunks_received = 0
             content_received = ""
             
-            for line in response.iter_lines(decode_unicode=True):
-                if line.startswith('data: '):
-                    data = line[6:]
-                    if data.strip() == '[DONE]':
-                        break
-                    
-                    try:
-                        chunk = json.loads(data)
-                        chunks_received += 1
-                        
-                        if 'choices' in chunk and len(chunk['choices']) > 0:
-                            delta = chunk['choices'][0].get('delta', {})
-                            if 'content' in delta and delta['content']:
-                                content_received += delta['content']
+            async for data in iter_sse_data(response):
+                if data.strip() == b'[DONE]':
+                    break
+                
+                try:
+                    chunk = orjson.loads(data)
+                    chunks_received += 1
                     
-                    except json.JSONDecodeError:
-                        pass
-            
-            print(f"Chunks received: {chunks_received}")
-            print(f"Content: {repr(content_received)}")
-            
-            if chunks_received > 0 and content_received:
-                print("✅ SUCCESS: Normal streaming works!")
-                return True
-            else:
-                print("❌ FAILED: No content received")
-                return False
+                    if 'choices' in chunk and len(chunk['choices']) > 0:
+                        delta = chunk['choices'][0].get('delta', {})
+                        if 'content' in delta and delta['content']:
+                            content_received += delta['content']
+                
+                except orjson.JSONDecodeError:
+                    pass
+        
+        print(f"Chunks received: {chunks_received}")
+        print(f"Content: {repr(content_received)}")
+        
+        if chunks_received > 0 and content_received:
+            print("✅ SUCCESS: Normal streaming works!")
+            return True
         else:
-            print(f"❌ HTTP error: {response.status_code}")
+            print("❌ FAILED: No content received")
             return False
             
     except Exception as e:
         print(f"❌ Test failed: {e}")
         return False
 
+def test_streaming_tool_calls():
+    """Test streaming tool call conversion"""
+    ensure_mock_server()
+    return asyncio.run(run_streaming_tests(streaming_tool_calls))[0]
+
+def test_streaming_normal():
+    """Test streaming without tool calls"""
+    ensure_mock_server()
+    return asyncio.run(run_streaming_tests(streaming_normal))[0]
+
 def main():
     print("Testing Streaming Tool Call Conversion")
     print("=" * 50)
     
-    # Test streaming tool calls
-    streaming_tools_ok = test_streaming_tool_calls()
-    
-    # Test streaming normal
-    streaming_normal_ok = test_streaming_normal()
+    # Both checks are I/O-bound against the proxy, so run them concurrently
+    ensure_mock_server()
+    streaming_tools_ok, streaming_normal_ok = asyncio.run(
+        run_streaming_tests(streaming_tool_calls, streaming_normal)
+    )
     
     print("\n" + "=" * 50)
     print("Test Results:")
@@ -4,8 +4,40 @@ Test <think> tag cleaning with environment variable control
 """
 
 import os
+import pytest
+from config import Config, config
 from converters.glm import GLMToolCallConverter
 
+# (REMOVE_THINK_TAGS value, whether complete think blocks are removed)
+ENV_VAR_VALUES = [
+    ('true', True), ('True', True), ('TRUE', True),
+    ('false', False), ('False', False), ('FALSE', False),
+    ('1', False), ('0', False), ('yes', False), ('no', False),
+]
+
+ENV_VAR_CONTENT = """
+    Response with <think>internal thinking</think> here.
+    """
+
+@pytest.fixture(autouse=True)
+def restore_think_env():
+    """Undo REMOVE_THINK_TAGS changes and reload the shared config after each test"""
+    saved = os.environ.get('REMOVE_THINK_TAGS')
+    yield
+    if saved is None:
+        os.environ.pop('REMOVE_THINK_TAGS', None)
+    else:
+        os.environ['REMOVE_THINK_TAGS'] = saved
+    config.update_from_env()
+
+@pytest.fixture
+def think_env():
+    """Set REMOVE_THINK_TAGS for one test and reload the shared config"""
+    def set_value(value):
+        os.environ['REMOVE_THINK_TAGS'] = value
+        config.update_from_env()
+    return set_value
+
 def test_with_remove_enabled():
     """Test with REMOVE_THINK_TAGS=true (default)"""
     print("Testing with REMOVE_THINK_TAGS=true (default)")
@@ -13,6 +45,7 @@ def test_with_remove_enabled():
     
     # Ensure environment variable is set to true
     os.environ['REMOVE_THINK_TAGS'] = 'true'
+    config.update_from_env()
     
     converter = GLMToolCallConverter()
     
@@ -27,10 +60,8 @@ def test_with_remove_enabled():
     """
     
     cleaned = converter._clean_content(content)
-    print(f"Original: {repr(content)}")
-    print(f"Cleaned: {repr(cleaned)}")
-    print(f"Contains complete think tags: {'<think>' in cleaned and '</think>' in cleaned}")
-    print(f"Contains orphaned closing tags: {'</think>' in cleaned}")
+    assert 'I need to think about this carefully.' not in cleaned
+    assert '</think>' not in cleaned
     print()
 
 def test_with_remove_disabled():
@@ -40,6 +71,7 @@ def test_with_remove_disabled():
     
     # Set environment variable to false
     os.environ['REMOVE_THINK_TAGS'] = 'false'
+    config.update_from_env()
     
     # Create new converter instance to pick up new config
     converter = GLMToolCallConverter()
@@ -55,10 +87,8 @@ def test_with_remove_disabled():
     """
     
     cleaned = converter._clean_content(content)
-    print(f"Original: {repr(content)}")
-    print(f"Cleaned: {repr(cleaned)}")
-    print(f"Contains complete think content: {'I need to think about this carefully.' in cleaned}")
-    print(f"Contains orphaned closing tags: {'</think>' in cleaned}")
+    assert 'I need to think about this carefully.' in cleaned
+    assert '</think>' not in cleaned
     print()
 
 def test_mixed_scenario():
@@ -67,6 +97,7 @@ def test_mixed_scenario():
     print("=" * 50)
     
     os.environ['REMOVE_THINK_TAGS'] = 'false'
+    config.update_from_env()
     converter = GLMToolCallConverter()
     
     content = """
@@ -84,28 +115,44 @@ def test_mixed_scenario():
     """
     
     cleaned = converter._clean_content(content)
-    print(f"Original: {repr(content)}")
-    print(f"Cleaned: {repr(cleaned)}")
-    print(f"Contains tool request: {'TOOL_REQUEST' in cleaned}")
-    print(f"Contains complete think content: {'internal reasoning' in cleaned}")
-    print(f"Contains orphaned closing tags: {'</think>' in cleaned}")
+    assert 'TOOL_REQUEST' not in cleaned
+    assert 'internal reasoning' in cleaned
+    assert '</think>' not in cleaned
     print()
 
-def test_env_var_variations():
-    """Test different environment variable values"""
-    print("Testing Environment Variable Variations")
-    print("=" * 50)
+def test_remove_disabled_without_think_tags(think_env):
+    """With removal off, content without think tags comes back as-is"""
+    think_env('false')
+    converter = GLMToolCallConverter()
     
-    test_values = ['true', 'True', 'TRUE', 'false', 'False', 'FALSE', '1', '0', 'yes', 'no']
+    content = "Plain answer with no reasoning markup."
+    assert converter._clean_content(content) is content
+    # An orphaned opener still has to be stripped
+    assert converter._clean_content("<think>Plain answer") == "Plain answer"
+
+@pytest.mark.parametrize("value,expect_removed", ENV_VAR_VALUES)
+def test_env_var_variations(value, expect_removed, monkeypatch):
+    """Only a case-insensitive 'true' enables think block removal"""
+    monkeypatch.setenv('REMOVE_THINK_TAGS', value)
+    assert Config().REMOVE_THINK_TAGS is expect_removed
+
+def test_clean_content_override():
+    """An explicit remove_think_tags argument decides removal for that call"""
+    converter = GLMToolCallConverter()
     
-    content = """
-    Response with <think>internal thinking</think> here.
-    """
+    for remove in (True, False):
+        cleaned = converter._clean_content(ENV_VAR_CONTENT, remove_think_tags=remove)
+        assert ('internal thinking' not in cleaned) == remove
+
+def print_env_var_variations():
+    """Print the outcome for each environment variable value"""
+    print("Testing Environment Variable Variations")
+    print("=" * 50)
     
-    for value in test_values:
+    for value, _ in ENV_VAR_VALUES:
         os.environ['REMOVE_THINK_TAGS'] = value
-        converter = GLMToolCallConverter()
-        cleaned = converter._clean_content(content)
+        config.update_from_env()
+        cleaned = GLMToolCallConverter()._clean_content(ENV_VAR_CONTENT)
         
         think_removed = 'internal thinking' not in cleaned
         print(f"REMOVE_THINK_TAGS='{value}' -> Think tags removed: {think_removed}")
@@ -116,7 +163,7 @@ if __name__ == "__main__":
     test_with_remove_enabled()
     test_with_remove_disabled()
     test_mixed_scenario()
-    test_env_var_variations()
+    print_env_var_variations()
     
     print("=" * 50)
     print("Environment Variable Configuration Test Complete")
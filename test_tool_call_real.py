@@ -5,16 +5,68 @@ This creates a mock backend that returns GLM-style tool call responses
 to verify our proxy conversion works end-to-end
 """
 
+import atexit
 import json
-import requests
-import subprocess
+import httpx
+import orjson
+import socket
 import time
-import sys
-import signal
-import os
 from http.server import HTTPServer, BaseHTTPRequestHandler
-import socketserver
 import threading
+from app import app as proxy_app
+
+# Mock responses are serialized once; only the created timestamp is
+# patched in per request
+_CREATED_PLACEHOLDER = b'"created":0'
+
+# The handler speaks HTTP/1.0 and closes the connection after each response
+_RESPONSE_HEAD = b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+
+_TOOL_CALL_BODY = orjson.dumps({
+    "id": "chatcmpl-mock-glm",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "glm-4.5-air-hi-mlx@4bit",
+    "choices": [
+        {
+            "index": 0,
+            "logprobs": None,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": "I'll search for information about that topic.\n<tool_call>fetch_wikipedia_content\n<arg_key>search_query</arg_key>\n<arg_value>Python programming language</arg_value>\n</tool_call>"
+            }
+        }
+    ],
+    "usage": {
+        "prompt_tokens": 50,
+        "completion_tokens": 30,
+        "total_tokens": 80
+    }
+})
+
+_NORMAL_BODY = orjson.dumps({
+    "id": "chatcmpl-mock-normal",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "glm-4.5-air-hi-mlx@4bit",
+    "choices": [
+        {
+            "index": 0,
+            "logprobs": None,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": "Hello! I'm a mock GLM response. How can I help you?"
+            }
+        }
+    ],
+    "usage": {
+        "prompt_tokens": 20,
+        "completion_tokens": 15,
+        "total_tokens": 35
+    }
+})
 
 class MockGLMHandler(BaseHTTPRequestHandler):
     """Mock GLM backend that returns GLM-style tool call responses"""
@@ -24,68 +76,17 @@ class MockGLMHandler(BaseHTTPRequestHandler):
             # Read the request
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode('utf-8'))
+            request_data = orjson.loads(post_data)
             
             # Check if tools are requested
             has_tools = 'tools' in request_data and len(request_data['tools']) > 0
+            body = _TOOL_CALL_BODY if has_tools else _NORMAL_BODY
             
-            if has_tools:
-                # Return GLM-style tool call response
-                glm_response = {
-                    "id": "chatcmpl-mock-glm",
-                    "object": "chat.completion",
-                    "created": int(time.time()),
-                    "model": "glm-4.5-air-hi-mlx@4bit",
-                    "choices": [
-                        {
-                            "index": 0,
-                            "logprobs": None,
-                            "finish_reason": "stop",
-                            "message": {
-                                "role": "assistant",
-                                "content": "I'll search for information about that topic.\n<tool_call>fetch_wikipedia_content\n<arg_key>search_query</arg_key>\n<arg_value>Python programming language</arg_value>\n</tool_call>"
-                            }
-                        }
-                    ],
-                    "usage": {
-                        "prompt_tokens": 50,
-                        "completion_tokens": 30,
-                        "total_tokens": 80
-                    }
-                }
-            else:
-                # Return normal response
-                glm_response = {
-                    "id": "chatcmpl-mock-normal",
-                    "object": "chat.completion", 
-                    "created": int(time.time()),
-                    "model": "glm-4.5-air-hi-mlx@4bit",
-                    "choices": [
-                        {
-                            "index": 0,
-                            "logprobs": None,
-                            "finish_reason": "stop",
-                            "message": {
-                                "role": "assistant",
-                                "content": "Hello! I'm a mock GLM response. How can I help you?"
-                            }
-                        }
-                    ],
-                    "usage": {
-                        "prompt_tokens": 20,
-                        "completion_tokens": 15,
-                        "total_tokens": 35
-                    }
-                }
-            
-            # Send response
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response_str = json.dumps(glm_response)
-            self.wfile.write(response_str.encode())
+            # Send status line, headers and body in a single write
+            response_body = body.replace(_CREATED_PLACEHOLDER, b'"created":%d' % int(time.time()))
+            self.wfile.write(_RESPONSE_HEAD % len(response_body) + response_body)
             
-            print(f"Mock GLM returned: {response_str}")
+            print(f"Mock GLM returned: {response_body.decode()}")
         else:
             self.send_response(404)
             self.end_headers()
@@ -100,6 +101,24 @@ def start_mock_glm_server():
     print("Mock GLM server started on port 8888")
     server.serve_forever()
 
+def wait_for_mock_glm_server(timeout=5.0):
+    """Poll until the mock server accepts connections instead of a fixed sleep"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('localhost', 8888), timeout=0.1):
+                return True
+        except OSError:
+            time.sleep(0.01)
+    return False
+
+# Drives the proxy's Flask app in-process through WSGITransport, so no proxy
+# has to be running on port 5000; the proxy still reaches the mock backend
+# over HTTP because it forwards with requests. Both tests share this client,
+# and the OpenAI SDK is handed it instead of building its own pool.
+PROXY = httpx.Client(transport=httpx.WSGITransport(app=proxy_app), base_url="http://proxy", timeout=10)
+atexit.register(PROXY.close)
+
 def test_tool_call_conversion():
     """Test tool call conversion through proxy"""
     print("=== Testing Tool Call Conversion ===")
@@ -107,7 +126,7 @@ def test_tool_call_conversion():
     # Start mock GLM server in background
     server_thread = threading.Thread(target=start_mock_glm_server, daemon=True)
     server_thread.start()
-    time.sleep(2)  # Wait for server to start
+    wait_for_mock_glm_server()
     
     # Test request with tools (should trigger GLM tool call response)
     test_request = {
@@ -135,18 +154,12 @@ def test_tool_call_conversion():
     
     try:
         print("Sending request with tools to proxy...")
-        response = requests.post(
-            "http://localhost:5000/v1/chat/completions",
-            json=test_request,
-            timeout=10
-        )
+        response = PROXY.post("/v1/chat/completions", json=test_request)
         
         print(f"Proxy response status: {response.status_code}")
         
         if response.status_code == 200:
             result = response.json()
-            print("Proxy response:")
-            print(json.dumps(result, indent=2))
             
             # Check if conversion worked
             message = result['choices'][0]['message']
@@ -168,6 +181,9 @@ def test_tool_call_conversion():
             else:
                 print("\n❌ FAILED: Tool call was not converted")
                 print(f"Message content: {message.get('content', 'No content')}")
+                # The full response is only worth dumping when diagnosing a failure
+                print("Proxy response:")
+                print(json.dumps(result, indent=2))
                 return False
         else:
             print(f"❌ HTTP error: {response.status_code}")
@@ -182,10 +198,16 @@ def test_openai_client_with_tools():
     """Test OpenAI client with tool calls"""
     print("\n=== Testing OpenAI Client with Tools ===")
     
+    # Imported here so collecting this file doesn't pay for the SDK import,
+    # and environments without it just skip this test
     try:
         from openai import OpenAI
-        
-        client = OpenAI(base_url="http://127.0.0.1:5000", api_key="lm-studio")
+    except ImportError:
+        print("⚠️  openai is not installed, skipping")
+        return None
+    
+    try:
+        client = OpenAI(base_url="http://proxy", api_key="lm-studio", http_client=PROXY)
         
         # Test with tools (should get GLM tool call response)
         response = client.chat.completions.create(
@@ -241,9 +263,11 @@ def main():
     print("\n" + "=" * 50)
     print("Test Results:")
     print(f"Tool Call Conversion: {'✅ PASS' if conversion_test else '❌ FAIL'}")
-    print(f"OpenAI Client Tools: {'✅ PASS' if client_test else '❌ FAIL'}")
+    # None means the test was skipped, not that it passed
+    client_status = '⏭️  SKIP' if client_test is None else '✅ PASS' if client_test else '❌ FAIL'
+    print(f"OpenAI Client Tools: {client_status}")
     
-    if conversion_test and client_test:
+    if conversion_test and client_test is not False:
         print("\n🎉 Tool call conversion is working correctly!")
         print("lmstudio-tooluse-test.py should work properly with tool calls.")
     else: